@@ -1,5 +1,19 @@
+from importlib import import_module
 from importlib.metadata import version
-from hypyp import analyses, prep, stats, utils, viz
 
 __version__ = version("hypyp")
 __all__ = ["analyses", "prep", "stats", "utils", "viz"]
+
+
+def __getattr__(name):
+    # submodules are imported on first access (PEP 562), so that
+    # `import hypyp` does not pull in matplotlib, autoreject or meshio
+    if name in __all__:
+        module = import_module("." + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
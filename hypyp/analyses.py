@@ -13,22 +13,22 @@ PSD, intra- and inter-brain measures functions
 
 import numpy as np
 import scipy
+import scipy.fft
 import scipy.signal as signal
 import scipy.stats
-import statsmodels.stats.multitest
+import contextlib
 import copy
+import math
+import warnings
 from collections import namedtuple
 from typing import Union
-from astropy.stats import circmean
-import matplotlib.pyplot as plt
-
-plt.ion()
 
 import mne
 from mne.io.constants import FIFF
 from mne.time_frequency import EpochsSpectrum
 
 from .mvarica import MVAR, connectivity_mvarica
+from .circular import centered_sin
 
 
 def pow(epochs: mne.Epochs, fmin: float, fmax: float, n_fft: int, n_per_seg: int, epochs_average: bool) -> tuple:
@@ -171,6 +171,7 @@ def behav_corr(data: np.ndarray, behav: np.ndarray, data_name: str, behav_name:
         # can also use np.convolve, np.correlate, np.corrcoeff
         # vizualisation
         if verbose:
+            import matplotlib.pyplot as plt
             plt.figure()
             plt.scatter(behav, data, label=str(r) + str(pvalue))
             plt.legend(loc='upper right')
@@ -194,6 +195,7 @@ def behav_corr(data: np.ndarray, behav: np.ndarray, data_name: str, behav_name:
                 pvals[i, j] = pvalue_i
         # correction for multiple comparisons
         if multiple_corr is True:
+            import statsmodels.stats.multitest
             # note: we reshape pvals to be able to use fdr_bh
             pvals_corrected = statsmodels.stats.multitest.multipletests(pvals.flatten(),
                                                                         alpha=0.05,
@@ -284,8 +286,43 @@ def indices_connectivity_interbrain(epoch_hyper: mne.Epochs) -> list:
     return channels
 
 
-def pair_connectivity(data: Union[list, np.ndarray], sampling_rate: int, frequencies: Union[dict, list], mode: str,
-                      epochs_average: bool = True) -> np.ndarray:
+def plan_decimation(sampling_rate: float, frequencies: Union[dict, list], oversampling: float = 4.) -> int:
+    """
+    Computes a decimation factor for band-limited analytic signals.
+
+    Arguments:
+        sampling_rate:
+            sampling rate of the data.
+        frequencies:
+            frequency bands (dictionary) or range (list), see pair_connectivity.
+        oversampling:
+            minimum ratio between the decimated sampling rate and the
+            highest band edge (default: 4).
+
+    Returns:
+        decim: largest factor such that sampling_rate / decim is at least
+            oversampling times the highest band edge, at least 1.
+
+    Note:
+        With the default oversampling of 4, the decimated Nyquist frequency
+        is twice the highest band edge. This is above the upper transition
+        band of MNE's automatic FIR design (at most 1.25 times the edge, or
+        edge + 2 Hz) and the +/- f/2 smoothing of the multitaper transform
+        of compute_single_freq, so the analytic signal is not aliased.
+    """
+    if isinstance(frequencies, dict):
+        f_max = max(band[1] for band in frequencies.values())
+    else:
+        f_max = frequencies[1]
+    return max(1, int(sampling_rate // (oversampling * f_max)))
+
+
+def pair_connectivity(data: Union[list, np.ndarray], sampling_rate: int, frequencies: Union[dict, list],
+                      mode: Union[str, list], epochs_average: bool = True,
+                      blocks: str = 'all', dtype: np.dtype = np.complex128,
+                      n_jobs: int = 1, window: float = None, hop: float = None,
+                      pairs: Union[list, np.ndarray] = None, out: str = None,
+                      cache=None, decim: Union[int, str] = None) -> Union[np.ndarray, dict, tuple]:
     """
     Computes frequency- or time-frequency-domain connectivity measures from preprocessed EEG data.
     This function aggregates compute_single_freq/compute_freq_bands and compute_sync.
@@ -305,6 +342,8 @@ def pair_connectivity(data: Union[list, np.ndarray], sampling_rate: int, frequen
 
         mode:
             connectivity measure. Options are in the notes.
+            If a list, all the measures are computed from the same analytic
+            signal and a dictionary of results is returned.
 
         epochs_average:
             option to either return the average connectivity across epochs (collapse across time) or preserve epoch-by-epoch connectivity, boolean.
@@ -312,6 +351,54 @@ def pair_connectivity(data: Union[list, np.ndarray], sampling_rate: int, frequen
             course is maintained).
             If True, PSD values are averaged over epochs.
 
+        blocks:
+            connectivity blocks to compute: 'all' (default), 'inter' or 'intra'.
+            See compute_sync.
+
+        dtype:
+            complex dtype of the analytic signal, carried through the
+            connectivity computation. np.complex64 halves memory and
+            bandwidth at the cost of single precision (default: np.complex128).
+
+        n_jobs:
+            number of jobs used for the filtering or multitaper transform
+            and for compute_sync, -1 uses all cores (default: 1).
+
+        window:
+            if set, length in seconds of sliding windows over which
+            time-resolved connectivity is computed (see compute_sync_windowed).
+            Each epoch is then treated as a continuous segment: its analytic
+            signal is computed once and shared by all its windows.
+
+        hop:
+            time in seconds between the starts of two windows, defaults to window.
+
+        pairs:
+            channel pairs to compute, as a list of (row, column) tuples or a
+            boolean mask over the 2*n_channels channels of the dyad. The result
+            then has a single pair dimension instead of the two channel
+            dimensions. See compute_sync. Not available with window.
+
+        out:
+            optional file name (.npy memory map, or HDF5 for '.h5'/'.hdf5')
+            the analytic signal of frequency bands is written to, which
+            compute_sync then streams epoch chunk by epoch chunk instead of
+            holding it in RAM. See compute_freq_bands. Only used when
+            frequencies is a dictionary. HDF5 files are closed once the
+            connectivity is computed.
+
+        cache:
+            optional hypyp.cache.TransformCache memoizing the analytic signal,
+            so that calls with the same data, sampling rate, frequencies and
+            dtype (e.g. for different modes) only transform the data once.
+            Not used with out.
+
+        decim:
+            decimation factor of the analytic signal, applied after band
+            limiting (filtering or multitaper transform) and before
+            compute_sync, int >= 1, or 'auto' to use plan_decimation. The cost
+            of compute_sync is divided by about decim. Not available with
+            out. Defaults to None, no decimation.
 
     Returns:
         result:
@@ -321,6 +408,16 @@ def pair_connectivity(data: Union[list, np.ndarray], sampling_rate: int, frequen
 
             To extract inter-brain connectivity values, slice the last two dimensions of con with [0:n_channels, n_channels: 2*n_channels].
 
+            With window set, a window axis is added after the epoch axis:
+            (n_freq, n_epochs, n_windows, 2*n_channels, 2*n_channels), or
+            (n_freq, n_windows, 2*n_channels, 2*n_channels) if epochs_average is True.
+
+            If decim is set, a namedtuple with
+              - con: the connectivity described above.
+              - sfreq: the sampling rate at which it was computed,
+                sampling_rate / decim.
+              - decim: the decimation factor used.
+
 
     Note:
         Connectivity is computed for all possible electrode pairs between
@@ -335,28 +432,218 @@ def pair_connectivity(data: Union[list, np.ndarray], sampling_rate: int, frequen
           - 'imaginary_coh': imaginary coherence
           - 'pli': phase lag index
           - 'wpli': weighted phase lag index
+          - 'wpli2_debiased': debiased squared weighted phase lag index
     """
 
     # Data consists of two lists of np.array (n_epochs, n_channels, epoch_size)
     assert data[0].shape[0] == data[1].shape[0], "Two streams much have the same lengths."
 
+    if decim == 'auto':
+        decim_factor = plan_decimation(sampling_rate, frequencies)
+    elif decim is None:
+        decim_factor = 1
+    elif isinstance(decim, (int, np.integer)) and not isinstance(decim, bool) and decim >= 1:
+        decim_factor = int(decim)
+    else:
+        raise ValueError("decim should be None, 'auto' or an integer of at least 1.")
+    if decim_factor > 1 and out is not None:
+        raise ValueError('decim is not available with out.')
+    sfreq = sampling_rate / decim_factor
+
     # compute instantaneous analytic signal from EEG data
     if type(frequencies) == list:
-        # average over tapers
-        values = np.mean(compute_single_freq(data, sampling_rate, frequencies), 3).squeeze()
+        # average over tapers, decimate within the transform
+        if cache is None:
+            values = compute_single_freq(data, sampling_rate, frequencies, dtype=dtype, n_jobs=n_jobs,
+                                         average='tapers', decim=decim_factor)
+        else:
+            values = cache.get(compute_single_freq, data, sampling_rate, frequencies, dtype=dtype, n_jobs=n_jobs,
+                               average='tapers', decim=decim_factor)
+        values = values.squeeze()
     elif type(frequencies) == dict:
-        values = compute_freq_bands(data, sampling_rate, frequencies)
+        if cache is None or out is not None:
+            values = compute_freq_bands(data, sampling_rate, frequencies, dtype=dtype, out=out, n_jobs=n_jobs)
+        else:
+            values = cache.get(compute_freq_bands, data, sampling_rate, frequencies, dtype=dtype, n_jobs=n_jobs)
+        if decim_factor > 1:
+            # the bands are already filtered, no anti-aliasing filter is needed
+            values = np.ascontiguousarray(values[..., ::decim_factor])
     else:
         TypeError("Please use a list or a dictionary to specify frequencies.")
 
     # compute connectivity values
-    result = compute_sync(values, mode, epochs_average)
+    if window is None:
+        result = compute_sync(values, mode, epochs_average, blocks=blocks, n_jobs=n_jobs, pairs=pairs)
+    elif pairs is not None:
+        raise ValueError('pairs is not available for windowed connectivity.')
+    else:
+        hop = window if hop is None else hop
+        result = compute_sync_windowed(values, mode, int(round(window * sfreq)),
+                                       int(round(hop * sfreq)), blocks=blocks)
+        if epochs_average:
+            if isinstance(result, dict):
+                result = {m: np.nanmean(con, axis=-4) for m, con in result.items()}
+            else:
+                result = np.nanmean(result, axis=-4)
 
+    # release the HDF5 file written with out, memory maps have no file handle
+    if out is not None and hasattr(values, 'file'):
+        values.file.close()
+
+    if decim is not None:
+        connectivity_tuple = namedtuple('connectivity', ['con', 'sfreq', 'decim'])
+        return connectivity_tuple(con=result, sfreq=sfreq, decim=decim_factor)
     return result
 
 
 # helper function
-def _multiply_conjugate(real: np.ndarray, imag: np.ndarray, transpose_axes: tuple) -> np.ndarray:
+def _dyad_memory(data_shape: tuple, frequencies: Union[dict, list], dtype: np.dtype,
+                 chunk_size: int = 64) -> int:
+    """
+    Helper function estimating the peak memory, in bytes, needed by
+    pair_connectivity for one dyad.
+
+    Arguments:
+        data_shape: (2, n_epochs, n_channels, n_times).
+        frequencies: frequency bands or range, see pair_connectivity.
+        dtype: complex dtype of the analytic signal.
+        chunk_size: number of time samples processed at once by the phase
+            lag measures of compute_sync.
+
+    Returns:
+        n_bytes: estimated peak memory. The multitaper transform is counted
+            with 3 tapers, and the filtering and Hilbert temporaries as three
+            more copies of the analytic signal.
+    """
+    _, n_epoch, n_ch, n_samp = data_shape
+    if isinstance(frequencies, dict):
+        n_freq = len(frequencies)
+    else:
+        n_freq = 3 * len(np.arange(frequencies[0], frequencies[1], 1))
+    itemsize = np.dtype(dtype).itemsize
+    complex_signal = 2 * n_epoch * n_ch * n_freq * n_samp * itemsize
+    phase_lag_chunk = n_epoch * n_freq * (2 * n_ch) ** 2 * chunk_size * itemsize // 2
+    return 4 * complex_signal + 3 * phase_lag_chunk
+
+
+def pair_connectivity_batch(data: Union[list, np.ndarray], sampling_rate: int, frequencies: Union[dict, list],
+                            mode: Union[str, list], epochs_average: bool = True,
+                            dyad_chunk: int = None, max_memory: float = 2e9,
+                            **kwargs) -> Union[np.ndarray, dict]:
+    """
+    Computes connectivity for a cohort of dyads, several dyads at a time.
+
+    Arguments:
+        data:
+            shape = (n_dyads, 2, n_epochs, n_channels, n_times), or an iterable
+            (e.g. a list or a generator) of (2, n_epochs, n_channels, n_times)
+            dyads, which is consumed one chunk of dyads at a time.
+            All dyads should have the same channels and number of samples
+            per epoch.
+        sampling_rate:
+            sampling rate.
+        frequencies:
+            frequency bands or range, see pair_connectivity.
+        mode:
+            connectivity measure, or list of measures, see pair_connectivity.
+        epochs_average:
+            whether to average connectivity over the epochs of each dyad,
+            boolean. If False, all dyads should have the same number of epochs.
+        dyad_chunk:
+            number of dyads processed together, int. Defaults to None, the
+            largest number of dyads whose estimated peak memory fits in
+            max_memory.
+        max_memory:
+            memory budget in bytes used to choose dyad_chunk (default: 2e9).
+        **kwargs:
+            other arguments of pair_connectivity: blocks, dtype, n_jobs,
+            window, hop, pairs and decim. With decim, the result is the
+            connectivity only; its sampling rate is given by plan_decimation.
+
+    Returns:
+        result:
+            connectivity with a leading dyad axis, e.g. shape
+            (n_dyads, n_freq, 2*n_channels, 2*n_channels) if epochs_average
+            is True, or (n_dyads, n_freq, n_epochs, 2*n_channels, 2*n_channels)
+            otherwise. If mode is a list, a dictionary of such arrays.
+
+    Note:
+        The epochs of the dyads of a chunk are concatenated, so that the
+        filtering, the Hilbert or multitaper transform and compute_sync each
+        run once per chunk on larger arrays, instead of once per dyad.
+        Connectivity is computed per epoch, so the result is the same as
+        calling pair_connectivity on each dyad.
+    """
+    dyads = iter(data)
+    first = next(dyads, None)
+    if first is None:
+        raise ValueError('data should contain at least one dyad.')
+    first = np.asarray(first)
+    if dyad_chunk is None:
+        dtype = kwargs.get('dtype', np.complex128)
+        dyad_chunk = max(1, int(max_memory // _dyad_memory(first.shape, frequencies, dtype)))
+
+    results = []
+    chunk = [first]
+    for dyad in dyads:
+        if len(chunk) == dyad_chunk:
+            results.extend(_pair_connectivity_chunk(chunk, sampling_rate, frequencies, mode, epochs_average,
+                                                    **kwargs))
+            chunk = []
+        chunk.append(np.asarray(dyad))
+    results.extend(_pair_connectivity_chunk(chunk, sampling_rate, frequencies, mode, epochs_average, **kwargs))
+
+    if isinstance(mode, str):
+        return np.stack(results)
+    return {m: np.stack([result[m] for result in results]) for m in mode}
+
+
+# helper function
+def _pair_connectivity_chunk(dyads: list, sampling_rate: int, frequencies: Union[dict, list],
+                             mode: Union[str, list], epochs_average: bool = True, **kwargs) -> list:
+    """
+    Helper function computing the connectivity of a chunk of dyads with a
+    single call to pair_connectivity, their epochs being concatenated.
+
+    Arguments:
+        dyads: list of (2, n_epochs, n_channels, n_times) arrays.
+        sampling_rate, frequencies, mode, epochs_average, **kwargs:
+            see pair_connectivity_batch.
+
+    Returns:
+        results: list of the connectivity of each dyad, arrays or
+            dictionaries of arrays as returned by pair_connectivity.
+    """
+    bounds = np.cumsum([dyad.shape[1] for dyad in dyads])[:-1]
+    con = pair_connectivity(np.concatenate(dyads, axis=1), sampling_rate, frequencies, mode,
+                            epochs_average=False, **kwargs)
+    if kwargs.get('decim') is not None:
+        con = con.con
+
+    # the epoch axis comes before the (channel, channel) or pair axes, and
+    # the window axis, so that it does not depend on blocks='intra'
+    if kwargs.get('pairs') is not None:
+        axis = -2
+    elif kwargs.get('window') is not None:
+        axis = -4
+    else:
+        axis = -3
+
+    def split(con):
+        cons = np.split(con, bounds, axis=axis)
+        if epochs_average:
+            cons = [np.nanmean(con, axis=axis) for con in cons]
+        return cons
+
+    if isinstance(con, dict):
+        cons = {m: split(c) for m, c in con.items()}
+        return [{m: cons[m][d] for m in cons} for d in range(len(dyads))]
+    return split(con)
+
+
+# helper function
+def _multiply_conjugate(real: np.ndarray, imag: np.ndarray, transpose_axes: tuple,
+                        real_y: np.ndarray = None, imag_y: np.ndarray = None) -> np.ndarray:
     """
     Helper function to compute the product of a complex array and its conjugate.
     It is designed specifically to collapse the last dimension of a four-dimensional array.
@@ -365,21 +652,29 @@ def _multiply_conjugate(real: np.ndarray, imag: np.ndarray, transpose_axes: tupl
         real: the real part of the array.
         imag: the imaginary part of the array.
         transpose_axes: axes to transpose for matrix multiplication.
+        real_y: the real part of a second array whose conjugate is used
+            instead of the first one (e.g. the channels of the other
+            participant), optional.
+        imag_y: the imaginary part of the second array, optional.
 
     Returns:
-        product: the product of the array and its complex conjugate.
+        product: the product of the array and its complex conjugate
+            (or the conjugate of the second array).
     """
+    if real_y is None:
+        real_y, imag_y = real, imag
     formula = 'jilm,jimk->jilk'
-    product = np.einsum(formula, real, real.transpose(transpose_axes)) + \
-              np.einsum(formula, imag, imag.transpose(transpose_axes)) - 1j * \
-              (np.einsum(formula, real, imag.transpose(transpose_axes)) - \
-               np.einsum(formula, imag, real.transpose(transpose_axes)))
+    product = np.einsum(formula, real, real_y.transpose(transpose_axes)) + \
+              np.einsum(formula, imag, imag_y.transpose(transpose_axes)) - 1j * \
+              (np.einsum(formula, real, imag_y.transpose(transpose_axes)) - \
+               np.einsum(formula, imag, real_y.transpose(transpose_axes)))
 
     return product
 
 
 # helper function
-def _multiply_conjugate_time(real: np.ndarray, imag: np.ndarray, transpose_axes: tuple) -> np.ndarray:
+def _multiply_conjugate_time(real: np.ndarray, imag: np.ndarray, transpose_axes: tuple,
+                             real_y: np.ndarray = None, imag_y: np.ndarray = None) -> np.ndarray:
     """
     Helper function to compute the product of a complex array and its conjugate.
     Unlike _multiply_conjugate, this doenst collapse the last dimension of a 
@@ -390,19 +685,460 @@ def _multiply_conjugate_time(real: np.ndarray, imag: np.ndarray, transpose_axes:
         real: the real part of the array.
         imag: the imaginary part of the array.
         transpose_axes: axes to transpose for matrix multiplication.
+        real_y: the real part of a second array whose conjugate is used
+            instead of the first one, optional.
+        imag_y: the imaginary part of the second array, optional.
     Returns:
         product: the product of the array and its complex conjugate.
     """
+    if real_y is None:
+        real_y, imag_y = real, imag
     formula = 'jilm,jimk->jilkm'
-    product = np.einsum(formula, real, real.transpose(transpose_axes)) + \
-              np.einsum(formula, imag, imag.transpose(transpose_axes)) - 1j * \
-              (np.einsum(formula, real, imag.transpose(transpose_axes)) - \
-               np.einsum(formula, imag, real.transpose(transpose_axes)))
+    product = np.einsum(formula, real, real_y.transpose(transpose_axes)) + \
+              np.einsum(formula, imag, imag_y.transpose(transpose_axes)) - 1j * \
+              (np.einsum(formula, real, imag_y.transpose(transpose_axes)) - \
+               np.einsum(formula, imag, real_y.transpose(transpose_axes)))
     
     return product
 
 
-def compute_sync(complex_signal: np.ndarray, mode: str, epochs_average: bool = True) -> np.ndarray:
+# helper function
+def _cross_spectrum(x: np.ndarray, y: np.ndarray = None, paired: bool = False) -> np.ndarray:
+    """
+    Helper function to compute the product of a complex array and its conjugate,
+    collapsing the last (time) dimension with a single batched complex
+    matrix product (x @ y^H for every epoch and frequency).
+
+    _multiply_conjugate computes the same quantity with four real einsums
+    and is kept as a reference implementation.
+
+    Arguments:
+        x: complex array, shape (..., n_ch_x, n_times).
+        y: complex array, shape (..., n_ch_y, n_times), optional.
+            Defaults to x.
+        paired: if True, x and y hold the two channels of each pair
+            (n_ch_x == n_ch_y == n_pairs) and only the matching rows are
+            multiplied.
+
+    Returns:
+        product: the cross-spectrum, shape (..., n_ch_x, n_ch_y),
+            or (..., n_pairs) if paired.
+    """
+    if y is None:
+        y = x
+    if paired:
+        return np.sum(x * np.conj(y), axis=-1)
+    return np.matmul(x, np.conj(y).swapaxes(-1, -2))
+
+
+# helper function
+def _cross_spectrum_time(x: np.ndarray, y: np.ndarray = None) -> np.ndarray:
+    """
+    Helper function to compute the product of a complex array and its conjugate,
+    preserving the last (time) dimension, with a single broadcast complex
+    product.
+
+    _multiply_conjugate_time computes the same quantity with four real einsums
+    and is kept as a reference implementation.
+
+    Arguments:
+        x: complex array, shape (..., n_ch_x, n_times).
+        y: complex array, shape (..., n_ch_y, n_times), optional.
+            Defaults to x.
+
+    Returns:
+        product: the product across time, shape (..., n_ch_x, n_ch_y, n_times).
+    """
+    if y is None:
+        y = x
+    return x[..., :, np.newaxis, :] * np.conj(y)[..., np.newaxis, :, :]
+
+
+# helper function
+def _phase_lag_sums(x: np.ndarray, y: np.ndarray, chunk_size: int = 64, paired: bool = False) -> dict:
+    """
+    Helper function accumulating, over chunks of time samples, the running
+    sums needed by the phase lag measures (pli, wpli, wpli2_debiased).
+    Peak memory only depends on chunk_size, not on the number of samples.
+
+    Arguments:
+        x: analytic signals of the rows, shape (n_epochs, n_freq, n_ch_x, n_times).
+        y: analytic signals of the columns, shape (n_epochs, n_freq, n_ch_y, n_times).
+        chunk_size: number of time samples processed at once.
+        paired: if True, only the matching rows of x and y are combined.
+
+    Returns:
+        sums: dictionary of arrays of shape (n_epochs, n_freq, n_ch_x, n_ch_y),
+            or (n_epochs, n_freq, n_pairs) if paired, with the sums over time of the sign ('sign'), the value ('imag'),
+            the absolute value ('abs') and the square ('sq') of the imaginary
+            part of the cross-spectrum.
+    """
+    n_samp = x.shape[-1]
+    shape = x.shape[:-1] if paired else x.shape[:-1] + (y.shape[-2],)
+    sums = {key: np.zeros(shape, dtype=x.real.dtype) for key in ('sign', 'imag', 'abs', 'sq')}
+
+    for start in range(0, n_samp, chunk_size):
+        stop = min(start + chunk_size, n_samp)
+        x_chunk = x[..., start:stop]
+        y_chunk = y[..., start:stop]
+        if not paired:
+            x_chunk = x_chunk[..., :, np.newaxis, :]
+            y_chunk = y_chunk[..., np.newaxis, :, :]
+        # imaginary part of x * conj(y), without forming the complex product
+        im = np.imag(x_chunk) * np.real(y_chunk)
+        im -= np.real(x_chunk) * np.imag(y_chunk)
+        sums['sign'] += np.sum(np.sign(im), axis=-1)
+        sums['imag'] += np.sum(im, axis=-1)
+        sums['sq'] += np.sum(im ** 2, axis=-1)
+        np.abs(im, out=im)
+        sums['abs'] += np.sum(im, axis=-1)
+
+    return sums
+
+
+# helper function
+def _corr_block(a: np.ndarray, b: np.ndarray, paired: bool = False) -> np.ndarray:
+    """
+    Helper function computing the correlation across time between each
+    row of a and each row of b, both already centered.
+
+    Arguments:
+        a: centered real signals, shape (..., n_ch_a, n_times).
+        b: centered real signals, shape (..., n_ch_b, n_times).
+        paired: if True, only the matching rows of a and b are correlated.
+
+    Returns:
+        corr: correlation values, shape (..., n_ch_a, n_ch_b),
+            or (..., n_pairs) if paired.
+    """
+    norm_a = np.sum(a ** 2, axis=-1)
+    norm_b = norm_a if b is a else np.sum(b ** 2, axis=-1)
+    if paired:
+        return np.sum(a * b, axis=-1) / np.sqrt(norm_a * norm_b)
+    return np.matmul(a, b.swapaxes(-1, -2)) / np.sqrt(norm_a[..., :, np.newaxis] * norm_b[..., np.newaxis, :])
+
+
+# helper function
+def _compute_sync_block(x: np.ndarray, y: np.ndarray, modes: list, chunk_size: int = 64,
+                        paired: bool = False, backend: str = 'numpy') -> dict:
+    """
+    Helper function computing connectivity blocks between two sets of
+    analytic signals (rows from x, columns from y) for one or several
+    measures. Intermediates (amplitudes, normalized phases, cross-spectrum,
+    phase lag sums) are computed once and shared between the measures.
+
+    Arguments:
+        x: analytic signals of the rows, shape (n_epochs, n_freq, n_ch_x, n_times).
+        y: analytic signals of the columns, shape (n_epochs, n_freq, n_ch_y, n_times).
+            When y is x, the signals are only transformed once.
+        modes: list of connectivity measures, see compute_sync.
+        chunk_size: number of time samples processed at once by the phase
+            lag measures.
+        paired: if True, x and y hold the two channels of each pair
+            (n_ch_x == n_ch_y == n_pairs) and only those pairs are computed.
+        backend: 'numpy', or 'numba' to compute the phase lag sums and the
+            ccorr phases with the compiled kernels of hypyp.numba_kernels.
+
+    Returns:
+        cons: dictionary mapping each measure of modes to its connectivity
+            block, of shape (n_epochs, n_freq, n_ch_x, n_ch_y), or
+            (n_epochs, n_freq, n_pairs) if paired.
+    """
+    n_samp = x.shape[-1]
+    same = y is x
+    names = [mode.lower() for mode in modes]
+    for name in names:
+        if name not in ('plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh',
+                        'ccorr', 'pli', 'wpli', 'wpli2_debiased'):
+            raise ValueError('Metric type not supported.')
+
+    # shared intermediates
+    if set(names) & {'plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh'}:
+        abs_x = np.abs(x)
+        abs_y = abs_x if same else np.abs(y)
+
+    if set(names) & {'coh', 'imaginary_coh'}:
+        dphi = _cross_spectrum(x, y, paired=paired)
+        amp_x = np.nansum(abs_x ** 2, axis=3)
+        amp_y = amp_x if same else np.nansum(abs_y ** 2, axis=3)
+        if paired:
+            amp = np.sqrt(amp_x * amp_y)
+        else:
+            amp = np.sqrt(amp_x[..., :, np.newaxis] * amp_y[..., np.newaxis, :])
+
+    if backend == 'numba':
+        from . import numba_kernels
+
+    if set(names) & {'pli', 'wpli', 'wpli2_debiased'}:
+        if backend == 'numba':
+            sums = numba_kernels.phase_lag_sums(x, y, paired=paired)
+        else:
+            sums = _phase_lag_sums(x, y, chunk_size=chunk_size, paired=paired)
+
+    cons = {}
+    for mode, name in zip(modes, names):
+        if name == 'plv':
+            phase_x = x / abs_x
+            phase_y = phase_x if same else y / abs_y
+            con = abs(_cross_spectrum(phase_x, phase_y, paired=paired)) / n_samp
+
+        elif name in ('envelope_corr', 'pow_corr'):
+            power = 1 if name == 'envelope_corr' else 2
+            env_x = abs_x ** power
+            env_x = env_x - np.mean(env_x, axis=3, keepdims=True)
+            if same:
+                env_y = env_x
+            else:
+                env_y = abs_y ** power
+                env_y = env_y - np.mean(env_y, axis=3, keepdims=True)
+            con = _corr_block(env_x, env_y, paired=paired)
+
+        elif name == 'coh':
+            con = np.abs(dphi) / amp
+
+        elif name == 'imaginary_coh':
+            con = np.abs(np.imag(dphi)) / amp
+
+        elif name == 'ccorr':
+            if backend == 'numba':
+                angle_x = numba_kernels.centered_sin(x)
+                angle_y = angle_x if same else numba_kernels.centered_sin(y)
+            else:
+                angle_x = centered_sin(np.angle(x), axis=3)
+                angle_y = angle_x if same else centered_sin(np.angle(y), axis=3)
+            con = np.abs(_corr_block(angle_x, angle_y, paired=paired))
+
+        elif name == 'pli':
+            con = abs(sums['sign']) / n_samp
+
+        elif name == 'wpli':
+            con_num = abs(sums['imag'])
+            con_den = sums['abs'].copy()
+            con_den[con_den == 0] = 1
+            con = con_num / con_den
+
+        else:
+            con_num = sums['imag'] ** 2 - sums['sq']
+            con_den = sums['abs'] ** 2 - sums['sq']
+            con_den[con_den == 0] = 1
+            con = con_num / con_den
+
+        cons[mode] = con
+
+    return cons
+
+
+# helper function
+def _compute_sync_chunk(x: np.ndarray, y: np.ndarray, modes: list, chunk_size: int, paired: bool = False,
+                        backend: str = 'numpy') -> dict:
+    """
+    Helper function run by the parallel workers of compute_sync.
+
+    Arguments:
+        x: analytic signals of the rows, shape (n_epochs, n_freq, n_ch_x, n_times).
+        y: analytic signals of the columns, or None to use x.
+        modes: list of connectivity measures.
+        chunk_size: number of time samples processed at once by the phase
+            lag measures.
+        paired: whether x and y hold channel pairs, see _compute_sync_block.
+        backend: 'numpy' or 'numba', see _compute_sync_block.
+
+    Returns:
+        cons: see _compute_sync_block.
+    """
+    return _compute_sync_block(x, x if y is None else y, modes, chunk_size, paired, backend)
+
+
+# helper function
+def _single_thread_blas(prefer: str = 'threads'):
+    """
+    Helper function returning a context in which the workers of a joblib
+    pool use a single BLAS thread, so that they do not oversubscribe the
+    cores.
+
+    Arguments:
+        prefer: 'threads' or 'processes', the kind of pool.
+
+    Returns:
+        context: context manager, to be entered once around the creation
+            and the run of the pool.
+
+    Note:
+        threadpool_limits changes the BLAS state of the whole process and is
+        not thread-safe, so a thread pool is limited once from the calling
+        thread (if threadpoolctl is installed). Worker processes are limited
+        by joblib through inner_max_num_threads.
+    """
+    if prefer == 'processes':
+        try:
+            from joblib import parallel_config
+        except ImportError:
+            return contextlib.nullcontext()
+        return parallel_config(backend='loky', inner_max_num_threads=1)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=1, user_api='blas')
+
+
+# helper function
+def _compute_sync_parallel(x: np.ndarray, y: np.ndarray, modes: list, chunk_size: int,
+                           n_jobs: int = 1, prefer: str = 'threads', paired: bool = False,
+                           backend: str = 'numpy') -> dict:
+    """
+    Helper function splitting the epoch and frequency axes of a connectivity
+    block computation into chunks run in parallel.
+
+    Arguments:
+        x: analytic signals of the rows, shape (n_epochs, n_freq, n_ch_x, n_times).
+        y: analytic signals of the columns, shape (n_epochs, n_freq, n_ch_y, n_times).
+        modes: list of connectivity measures.
+        chunk_size: number of time samples processed at once by the phase
+            lag measures.
+        n_jobs: number of jobs, -1 uses all cores.
+        prefer: 'threads' or 'processes', the kind of pool used by joblib.
+        paired: whether x and y hold channel pairs, see _compute_sync_block.
+        backend: 'numpy' or 'numba', see _compute_sync_block.
+
+    Returns:
+        cons: see _compute_sync_block.
+    """
+    n_epoch, n_freq = x.shape[:2]
+    if n_jobs == 1:
+        return _compute_sync_block(x, y, modes, chunk_size, paired, backend)
+
+    with _single_thread_blas(prefer):
+        parallel, p_fun, n_jobs = mne.parallel.parallel_func(_compute_sync_chunk, n_jobs, prefer=prefer,
+                                                             max_jobs=n_epoch * n_freq, verbose=False)
+        if n_jobs == 1:
+            return _compute_sync_block(x, y, modes, chunk_size, paired, backend)
+
+        # split epochs first, then frequencies if there are fewer epochs than jobs
+        n_epoch_chunks = min(n_epoch, n_jobs)
+        n_freq_chunks = min(n_freq, int(np.ceil(n_jobs / n_epoch_chunks)))
+        slices = [(epochs, freqs)
+                  for epochs in np.array_split(np.arange(n_epoch), n_epoch_chunks)
+                  for freqs in np.array_split(np.arange(n_freq), n_freq_chunks)]
+        slices = [(slice(epochs[0], epochs[-1] + 1), slice(freqs[0], freqs[-1] + 1)) for epochs, freqs in slices]
+
+        same = y is x
+        results = parallel(p_fun(x[epochs, freqs], None if same else y[epochs, freqs], modes, chunk_size,
+                                 paired, backend)
+                           for epochs, freqs in slices)
+
+    cons = {}
+    for m in modes:
+        first = results[0][m]
+        cons[m] = np.empty((n_epoch, n_freq) + first.shape[2:], dtype=first.dtype)
+        for (epochs, freqs), result in zip(slices, results):
+            cons[m][epochs, freqs] = result[m]
+    return cons
+
+
+# helper function
+def _block_signals(complex_signal: np.ndarray, blocks: str = 'all') -> list:
+    """
+    Helper function returning the (rows, columns) signal pairs of the
+    requested connectivity blocks.
+
+    Arguments:
+        complex_signal: analytic signals, shape (2, n_epochs, n_channels, n_freq_bins, n_times).
+        blocks: 'all', 'inter' or 'intra', see compute_sync.
+
+    Returns:
+        pairs: list of (x, y) tuples of arrays of shape
+            (n_epochs, n_freq, n_ch, n_times), one for 'all' and 'inter',
+            one per participant for 'intra'. y is x for symmetric blocks.
+    """
+    n_epoch, n_ch, n_freq, n_samp = complex_signal.shape[1], complex_signal.shape[2], \
+                                    complex_signal.shape[3], complex_signal.shape[4]
+
+    if blocks == 'all':
+        # calculate all epochs at once, the only downside is that the disk may not have enough space
+        complex_signal = complex_signal.transpose((1, 3, 0, 2, 4)).reshape(n_epoch, n_freq, 2 * n_ch, n_samp)
+        return [(complex_signal, complex_signal)]
+    # views on each participant, no concatenated copy of the signal
+    signals = complex_signal.transpose((0, 1, 3, 2, 4))
+    if blocks == 'inter':
+        return [(signals[0], signals[1])]
+    if blocks == 'intra':
+        return [(signals[participant], signals[participant]) for participant in range(2)]
+    raise ValueError("blocks should be 'all', 'inter' or 'intra'.")
+
+
+# helper function
+def _pair_indices(pairs: Union[list, np.ndarray], n_channels: int) -> tuple:
+    """
+    Helper function converting a channel pair selection into row and
+    column indices.
+
+    Arguments:
+        pairs: list of (row, column) channel index tuples, e.g. as returned by
+            indices_connectivity_interbrain, or boolean mask of shape
+            (n_channels, n_channels).
+        n_channels: number of channels indexed by the pairs.
+
+    Returns:
+        rows, cols: integer arrays of shape (n_pairs,).
+    """
+    pairs = np.asarray(pairs)
+    if pairs.dtype == bool:
+        if pairs.shape != (n_channels, n_channels):
+            raise ValueError('The pair mask should have shape ({0}, {0}).'.format(n_channels))
+        rows, cols = np.nonzero(pairs)
+    else:
+        if pairs.ndim != 2 or pairs.shape[1] != 2:
+            raise ValueError('pairs should be a list of (row, column) tuples or a boolean mask.')
+        rows, cols = pairs[:, 0], pairs[:, 1]
+    if len(rows) and (min(rows.min(), cols.min()) < 0 or max(rows.max(), cols.max()) >= n_channels):
+        raise ValueError('Channel pair indices should be between 0 and {}.'.format(n_channels - 1))
+    return rows, cols
+
+
+# helper function
+def _compute_sync_blocks(complex_signal: np.ndarray, modes: list, blocks: str = 'all', chunk_size: int = 64,
+                         n_jobs: int = 1, prefer: str = 'threads', pairs: Union[list, np.ndarray] = None,
+                         backend: str = 'numpy') -> dict:
+    """
+    Helper function computing the requested connectivity blocks for every
+    epoch, before any averaging.
+
+    Arguments:
+        complex_signal: analytic signals, shape (2, n_epochs, n_channels, n_freq_bins, n_times).
+        modes: list of connectivity measures.
+        blocks: 'all', 'inter' or 'intra', see compute_sync.
+        chunk_size: number of time samples processed at once by the phase
+            lag measures.
+        n_jobs: number of jobs.
+        prefer: 'threads' or 'processes'.
+        pairs: channel pairs to compute, see compute_sync. blocks is then ignored.
+        backend: 'numpy' or 'numba', see _compute_sync_block.
+
+    Returns:
+        cons: dictionary mapping each measure of modes to an array of shape
+            (n_epochs, n_freq, n_ch, n_ch), with a leading participant axis
+            for blocks='intra', or (n_epochs, n_freq, n_pairs) if pairs is set.
+    """
+    if pairs is not None:
+        (signals, _), = _block_signals(complex_signal, 'all')
+        rows, cols = _pair_indices(pairs, signals.shape[2])
+        return _compute_sync_parallel(signals[:, :, rows], signals[:, :, cols], modes, chunk_size,
+                                      n_jobs, prefer, paired=True, backend=backend)
+
+    signal_pairs = _block_signals(complex_signal, blocks)
+    cons = [_compute_sync_parallel(x, y, modes, chunk_size, n_jobs, prefer, backend=backend)
+            for x, y in signal_pairs]
+    if blocks == 'intra':
+        return {m: np.array([cons_participant[m] for cons_participant in cons]) for m in modes}
+    return cons[0]
+
+
+def compute_sync(complex_signal: np.ndarray, mode: Union[str, list], epochs_average: bool = True,
+                 blocks: str = 'all', chunk_size: int = 64, dtype: np.dtype = None,
+                 n_jobs: int = 1, prefer: str = 'threads',
+                 pairs: Union[list, np.ndarray] = None, epoch_chunk: int = 16,
+                 backend: str = 'numpy') -> Union[np.ndarray, dict]:
     """
     Computes frequency- or time-frequency-domain connectivity measures from analytic signals.
 
@@ -411,15 +1147,73 @@ def compute_sync(complex_signal: np.ndarray, mode: str, epochs_average: bool = T
         complex_signal:
             shape = (2, n_epochs, n_channels, n_freq_bins, n_times).
             Analytic signals for computing connectivity between two participants.
+            An out-of-core np.memmap or h5py.Dataset, as written by
+            compute_freq_bands with out, is streamed epoch_chunk epochs at a
+            time instead of being loaded in RAM.
 
         mode:
             Connectivity measure. Options in the notes.
+            A list of measures can be given to compute them in a single pass,
+            sharing the intermediates (amplitudes, normalized phases,
+            cross-spectrum, phase lag sums) between the measures.
 
         epochs_average:
             option to either return the average connectivity across epochs (collapse across time) or preserve epoch-by-epoch connectivity, boolean.
             If False, PSD won't be averaged over epochs (the time course is maintained).
             If True, PSD values are averaged over epochs.
 
+        blocks:
+            connectivity blocks to compute, str.
+            - 'all': the full (2*n_channels, 2*n_channels) matrix (default).
+            - 'inter': only the inter-brain block, rows are the channels of
+              the first participant and columns those of the second one.
+            - 'intra': only the two intra-brain blocks, stacked on a leading
+              participant axis.
+            Computing a single block type is roughly 2 to 4 times cheaper
+            in time and memory than the full matrix.
+
+        chunk_size:
+            number of time samples processed at once by the phase lag
+            measures ('pli', 'wpli', 'wpli2_debiased'), int. Their running
+            sums are accumulated chunk by chunk, so peak memory scales with
+            chunk_size instead of n_times (default: 64).
+
+        dtype:
+            complex dtype used for the computation, e.g. np.complex64 to
+            halve memory and bandwidth. Defaults to None, which keeps the
+            dtype of complex_signal. Connectivity values are returned in the
+            matching real precision.
+
+        n_jobs:
+            number of jobs used to compute chunks of epochs and frequencies
+            in parallel, -1 uses all cores (default: 1). BLAS is limited to
+            one thread per worker, through threadpoolctl (if installed) for
+            threads and joblib for processes.
+
+        prefer:
+            'threads' (default) or 'processes', the kind of pool used by joblib.
+
+        pairs:
+            channel pairs to compute, either a list of (row, column) tuples
+            indexing the 2*n_channels channels of the dyad (participant 1
+            first, e.g. as returned by indices_connectivity_interbrain), or a
+            boolean mask of shape (2*n_channels, 2*n_channels). Only those
+            edges are computed and the two channel dimensions of the result
+            are replaced by a single pair dimension, in the order of the
+            list (row-major order for a mask). blocks is then ignored.
+            Defaults to None, all pairs of the requested blocks.
+
+        epoch_chunk:
+            number of epochs read at once from an out-of-core complex_signal
+            (default: 16). Unused for in-memory arrays.
+
+        backend:
+            'numpy' (default) or 'numba'. With 'numba', the phase lag
+            measures ('pli', 'wpli', 'wpli2_debiased') and 'ccorr' use
+            compiled loops over channel pairs and time samples, run in
+            parallel on numba's threads, instead of (channel, channel, time)
+            NumPy intermediates. Falls back to 'numpy' with a warning when
+            numba is not installed.
 
     Returns:
         con:
@@ -429,6 +1223,15 @@ def compute_sync(complex_signal: np.ndarray, mode: str, epochs_average: bool = T
 
             To extract inter-brain connectivity values, slice the last two dimensions of con with [0:n_channels, n_channels: 2*n_channels].
 
+            With blocks='inter', the last two dimensions are (n_channels, n_channels)
+            and already contain the inter-brain values. With blocks='intra',
+            a leading axis of size 2 indexes the participant.
+
+            With pairs, the shape is (n_freq, n_epochs, n_pairs) or (n_freq, n_pairs).
+
+            If mode is a list, a dictionary mapping each measure to its
+            connectivity matrix is returned.
+
     Note:
         **supported connectivity measures**
           - 'envelope_corr': envelope correlation
@@ -439,85 +1242,410 @@ def compute_sync(complex_signal: np.ndarray, mode: str, epochs_average: bool = T
           - 'imaginary_coh': imaginary coherence
           - 'pli': phase lag index
           - 'wpli': weighted phase lag index
+          - 'wpli2_debiased': debiased squared weighted phase lag index
+            (Vinck et al., 2011), the sums being taken over time
 
     """
 
-    n_epoch, n_ch, n_freq, n_samp = complex_signal.shape[1], complex_signal.shape[2], \
-                                    complex_signal.shape[3], complex_signal.shape[4]
+    if backend not in ('numpy', 'numba'):
+        raise ValueError("backend should be 'numpy' or 'numba'.")
+    if backend == 'numba':
+        try:
+            import numba  # noqa: F401
+        except ImportError:
+            warnings.warn("numba is not installed, falling back to backend='numpy'.")
+            backend = 'numpy'
+
+    modes = [mode] if isinstance(mode, str) else list(mode)
+    # number of trailing channel dimensions: (n_ch, n_ch) or (n_pairs,)
+    n_ch_axes = 2 if pairs is None else 1
+
+    if isinstance(complex_signal, np.ndarray) and not isinstance(complex_signal, np.memmap):
+        if dtype is not None:
+            complex_signal = np.asarray(complex_signal, dtype=dtype)
+        cons = _compute_sync_blocks(complex_signal, modes, blocks, chunk_size, n_jobs, prefer, pairs, backend)
+    else:
+        # out-of-core signal: only epoch_chunk epochs are in memory at once
+        n_epoch = complex_signal.shape[1]
+        chunks = []
+        for e0 in range(0, n_epoch, epoch_chunk):
+            signal_chunk = np.asarray(complex_signal[:, e0:e0 + epoch_chunk], dtype=dtype)
+            chunks.append(_compute_sync_blocks(signal_chunk, modes, blocks, chunk_size, n_jobs, prefer, pairs,
+                                               backend))
+        cons = {m: np.concatenate([chunk[m] for chunk in chunks], axis=-n_ch_axes - 2) for m in modes}
+    for m, con in cons.items():
+        con = con.swapaxes(-n_ch_axes - 2, -n_ch_axes - 1)  # n_freq x n_epoch x n_ch x n_ch
+        if epochs_average:
+            con = np.nanmean(con, axis=-n_ch_axes - 1)
+        cons[m] = con
+
+    if isinstance(mode, str):
+        return cons[mode]
+    return cons
+
+
+class SyncAccumulator:
+    """
+    Incremental epoch-averaged connectivity, for sessions where epochs
+    arrive over time.
 
-    # calculate all epochs at once, the only downside is that the disk may not have enough space
-    complex_signal = complex_signal.transpose((1, 3, 0, 2, 4)).reshape(n_epoch, n_freq, 2 * n_ch, n_samp)
-    transpose_axes = (0, 1, 3, 2)
-    if mode.lower() == 'plv':
-        phase = complex_signal / np.abs(complex_signal)
-        c = np.real(phase)
-        s = np.imag(phase)
-        dphi = _multiply_conjugate(c, s, transpose_axes=transpose_axes)
-        con = abs(dphi) / n_samp
-
-    elif mode.lower() == 'envelope_corr':
-        env = np.abs(complex_signal)
-        mu_env = np.mean(env, axis=3).reshape(n_epoch, n_freq, 2 * n_ch, 1)
-        env = env - mu_env
-        con = np.einsum('nilm,nimk->nilk', env, env.transpose(transpose_axes)) / \
-              np.sqrt(np.einsum('nil,nik->nilk', np.sum(env ** 2, axis=3), np.sum(env ** 2, axis=3)))
-
-    elif mode.lower() == 'pow_corr':
-        env = np.abs(complex_signal) ** 2
-        mu_env = np.mean(env, axis=3).reshape(n_epoch, n_freq, 2 * n_ch, 1)
-        env = env - mu_env
-        con = np.einsum('nilm,nimk->nilk', env, env.transpose(transpose_axes)) / \
-              np.sqrt(np.einsum('nil,nik->nilk', np.sum(env ** 2, axis=3), np.sum(env ** 2, axis=3)))
-
-    elif mode.lower() == 'coh':
-        c = np.real(complex_signal)
-        s = np.imag(complex_signal)
-        amp = np.abs(complex_signal) ** 2
-        dphi = _multiply_conjugate(c, s, transpose_axes=transpose_axes)
-        con = np.abs(dphi) / np.sqrt(np.einsum('nil,nik->nilk', np.nansum(amp, axis=3),
-                                               np.nansum(amp, axis=3)))
-
-    elif mode.lower() == 'imaginary_coh':
-        c = np.real(complex_signal)
-        s = np.imag(complex_signal)
-        amp = np.abs(complex_signal) ** 2
-        dphi = _multiply_conjugate(c, s, transpose_axes=transpose_axes)
-        con = np.abs(np.imag(dphi)) / np.sqrt(np.einsum('nil,nik->nilk', np.nansum(amp, axis=3),
-                                                        np.nansum(amp, axis=3)))
-
-    elif mode.lower() == 'ccorr':
-        angle = np.angle(complex_signal)
-        mu_angle = circmean(angle, axis=3).reshape(n_epoch, n_freq, 2 * n_ch, 1)
-        angle = np.sin(angle - mu_angle)
-
-        formula = 'nilm,nimk->nilk'
-        con = np.abs(np.einsum(formula, angle, angle.transpose(transpose_axes)) /
-                     np.sqrt(np.einsum('nil,nik->nilk', np.sum(angle ** 2, axis=3), 
-                                       np.sum(angle ** 2, axis=3))))
-        
-    elif mode.lower() == 'pli':
-        c = np.real(complex_signal)
-        s = np.imag(complex_signal)
-        dphi = _multiply_conjugate_time(c, s, transpose_axes=transpose_axes)
-        con = abs(np.mean(np.sign(np.imag(dphi)), axis=4))
-        
-    elif mode.lower() == 'wpli':
-        c = np.real(complex_signal)
-        s = np.imag(complex_signal)
-        dphi = _multiply_conjugate_time(c, s, transpose_axes=transpose_axes)
-        con_num = abs(np.mean(abs(np.imag(dphi)) * np.sign(np.imag(dphi)), axis=4))
-        con_den = np.mean(abs(np.imag(dphi)), axis=4)      
-        con_den[con_den == 0] = 1 
-        con = con_num / con_den        
+    For each measure, the accumulator only keeps the sum over epochs of the
+    per-epoch connectivity values and the number of valid epochs, so that
+    adding N epochs costs O(N) and memory does not grow with the session
+    length. result() gives the same values as
+    compute_sync(..., epochs_average=True) on all the epochs seen so far.
 
+    Arguments:
+        mode: connectivity measure or list of measures, see compute_sync.
+        blocks: connectivity blocks to compute, 'all', 'inter' or 'intra'.
+        chunk_size: number of time samples processed at once by the phase
+            lag measures.
+        n_jobs: number of jobs for each update.
+
+    Example:
+        >>> acc = SyncAccumulator(['plv', 'wpli'], blocks='inter')
+        >>> for batch in stream:  # (2, n_epochs, n_channels, n_freq_bins, n_times)
+        ...     acc.update(batch)
+        >>> cons = acc.result()
+    """
+
+    def __init__(self, mode: Union[str, list], blocks: str = 'all', chunk_size: int = 64, n_jobs: int = 1):
+        self.mode = mode
+        self.modes = [mode] if isinstance(mode, str) else list(mode)
+        self.blocks = blocks
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.n_epochs = 0
+        self._sums = None
+        self._counts = None
+
+    def update(self, epoch_batch: np.ndarray) -> 'SyncAccumulator':
+        """
+        Adds a batch of epochs to the running sums.
+
+        Arguments:
+            epoch_batch: analytic signals of the new epochs,
+                shape (2, n_epochs, n_channels, n_freq_bins, n_times).
+
+        Returns:
+            self
+        """
+        cons = _compute_sync_blocks(epoch_batch, self.modes, self.blocks, self.chunk_size, self.n_jobs)
+        if self._sums is None:
+            self._sums = {m: np.zeros(con.shape[:-4] + con.shape[-3:], dtype=con.dtype) for m, con in cons.items()}
+            self._counts = {m: np.zeros(con.shape[:-4] + con.shape[-3:], dtype=int) for m, con in cons.items()}
+        for m, con in cons.items():
+            self._sums[m] += np.nansum(con, axis=-4)
+            self._counts[m] += np.sum(~np.isnan(con), axis=-4)
+        self.n_epochs += epoch_batch.shape[1]
+        return self
+
+    def result(self) -> Union[np.ndarray, dict]:
+        """
+        Returns the connectivity averaged over all the epochs seen so far.
+
+        Returns:
+            con: connectivity matrix of shape (n_freq, n_ch, n_ch), with a
+                leading participant axis for blocks='intra', or a dictionary
+                of them if mode is a list.
+        """
+        if self._sums is None:
+            raise ValueError('No epoch has been added to the accumulator.')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cons = {m: self._sums[m] / self._counts[m] for m in self.modes}
+        if isinstance(self.mode, str):
+            return cons[self.mode]
+        return cons
+
+
+# helper function
+def _block_sum(values: np.ndarray, block: int) -> np.ndarray:
+    """
+    Helper function summing values over consecutive blocks of samples.
+
+    Arguments:
+        values: array of shape (n_epochs, n_freq, ..., n_times), n_times
+            being a multiple of block.
+        block: number of samples per block.
+
+    Returns:
+        sums: array of shape (n_epochs, n_freq, n_blocks, ...).
+    """
+    shape = values.shape[:-1] + (values.shape[-1] // block, block)
+    return np.moveaxis(values.reshape(shape).sum(axis=-1), -1, 2)
+
+
+# helper function
+def _block_cross(a: np.ndarray, b: np.ndarray, block: int) -> np.ndarray:
+    """
+    Helper function computing the products a_l * b_k summed over consecutive
+    blocks of samples, with one batched matrix product per block.
+
+    Arguments:
+        a: array of shape (n_epochs, n_freq, n_ch_a, n_times).
+        b: array of shape (n_epochs, n_freq, n_ch_b, n_times), conjugated
+            beforehand if needed.
+        block: number of samples per block, n_times being a multiple of it.
+
+    Returns:
+        sums: array of shape (n_epochs, n_freq, n_blocks, n_ch_a, n_ch_b).
+    """
+    n_blocks = a.shape[-1] // block
+    a = a.reshape(a.shape[:-1] + (n_blocks, block)).swapaxes(2, 3)
+    b = b.reshape(b.shape[:-1] + (n_blocks, block)).swapaxes(2, 3)
+    return np.matmul(a, b.swapaxes(-1, -2))
+
+
+# helper function
+def _windowed_sums(quantities: dict, n_times: int, window: int, hop: int, chunk_size: int = 64) -> dict:
+    """
+    Helper function computing sums of quantities over sliding windows.
+
+    Time is cut into blocks of gcd(window, hop) samples, every window being
+    made of whole blocks. The quantities are summed per block, chunk by
+    chunk, into running sums that are recorded at the block indices where
+    windows start or stop, and the window sums are differences of these
+    records. The cost is linear in the number of samples whatever the
+    window length and overlap, and the memory is linear in the number of
+    windows whatever the block length.
+
+    Arguments:
+        quantities: dictionary mapping names to functions f(start, stop, block)
+            returning the sums of the quantity over the blocks of the samples
+            start:stop, with the block axis in third position.
+        n_times: number of samples.
+        window: window length in samples.
+        hop: number of samples between the starts of two windows.
+        chunk_size: number of samples processed at once (rounded to a
+            whole number of blocks).
+
+    Returns:
+        sums: dictionary mapping names to arrays of windowed sums, the window
+            axis being in third position.
+    """
+    n_windows = (n_times - window) // hop + 1
+    if n_windows < 1:
+        raise ValueError('The window is longer than the signal.')
+    block = math.gcd(window, hop)
+    starts = np.arange(n_windows) * hop // block
+    stops = starts + window // block
+    n_blocks = stops[-1]
+    blocks_per_chunk = max(1, chunk_size // block)
+    # block indices where the running sums are recorded, the first one being 0
+    marks = np.union1d(starts, stops)
+
+    running = {}
+    records = {}
+    for start in range(0, n_blocks, blocks_per_chunk):
+        stop = min(start + blocks_per_chunk, n_blocks)
+        marked = marks[(marks > start) & (marks <= stop)]
+        for name, quantity in quantities.items():
+            sums = quantity(start * block, stop * block, block)
+            if name not in running:
+                running[name] = np.zeros(sums.shape[:2] + sums.shape[3:], dtype=sums.dtype)
+                records[name] = np.zeros(sums.shape[:2] + (len(marks),) + sums.shape[3:], dtype=sums.dtype)
+            if len(marked):
+                cum = np.cumsum(sums, axis=2)
+                records[name][:, :, np.searchsorted(marks, marked)] = (running[name][:, :, np.newaxis]
+                                                                       + cum[:, :, marked - start - 1])
+            running[name] += sums.sum(axis=2)
+
+    starts = np.searchsorted(marks, starts)
+    stops = np.searchsorted(marks, stops)
+    return {name: record[:, :, stops] - record[:, :, starts] for name, record in records.items()}
+
+
+# helper function
+def _compute_sync_windowed_block(x: np.ndarray, y: np.ndarray, modes: list, window: int, hop: int,
+                                 chunk_size: int = 64) -> dict:
+    """
+    Helper function computing sliding-window connectivity blocks between two
+    sets of analytic signals from windowed sums.
+
+    Arguments:
+        x: analytic signals of the rows, shape (n_epochs, n_freq, n_ch_x, n_times).
+        y: analytic signals of the columns, shape (n_epochs, n_freq, n_ch_y, n_times).
+        modes: list of connectivity measures.
+        window: window length in samples.
+        hop: number of samples between the starts of two windows.
+        chunk_size: number of samples processed at once.
+
+    Returns:
+        cons: dictionary mapping each measure of modes to an array of shape
+            (n_epochs, n_freq, n_windows, n_ch_x, n_ch_y).
+    """
+    names = [mode.lower() for mode in modes]
+    for name in names:
+        if name not in ('plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh',
+                        'ccorr', 'pli', 'wpli', 'wpli2_debiased'):
+            raise ValueError('Metric type not supported.')
+
+    def imag_cross(start, stop):
+        x_chunk, y_chunk = x[..., start:stop], y[..., start:stop]
+        im = np.imag(x_chunk)[..., :, np.newaxis, :] * np.real(y_chunk)[..., np.newaxis, :, :]
+        im -= np.real(x_chunk)[..., :, np.newaxis, :] * np.imag(y_chunk)[..., np.newaxis, :, :]
+        return im
+
+    quantities = {}
+    if 'plv' in names:
+        quantities['plv'] = lambda start, stop, block: _block_cross(
+            x[..., start:stop] / np.abs(x[..., start:stop]),
+            np.conj(y[..., start:stop] / np.abs(y[..., start:stop])), block)
+    if set(names) & {'coh', 'imaginary_coh'}:
+        quantities['cross'] = lambda start, stop, block: _block_cross(x[..., start:stop],
+                                                                     np.conj(y[..., start:stop]), block)
+        quantities['pow_x'] = lambda start, stop, block: _block_sum(np.abs(x[..., start:stop]) ** 2, block)
+        quantities['pow_y'] = lambda start, stop, block: _block_sum(np.abs(y[..., start:stop]) ** 2, block)
+    for name, power in (('envelope_corr', 1), ('pow_corr', 2)):
+        if name in names:
+            for label, values in (('x', x), ('y', y)):
+                quantities[name + '_' + label] = lambda start, stop, block, values=values, power=power: \
+                    _block_sum(np.abs(values[..., start:stop]) ** power, block)
+                quantities[name + '_' + label * 2] = lambda start, stop, block, values=values, power=power: \
+                    _block_sum(np.abs(values[..., start:stop]) ** (2 * power), block)
+            quantities[name + '_xy'] = lambda start, stop, block, power=power: _block_cross(
+                np.abs(x[..., start:stop]) ** power, np.abs(y[..., start:stop]) ** power, block)
+    if 'ccorr' in names:
+        for label_x, part_x in (('s', np.sin), ('c', np.cos)):
+            for label_y, part_y in (('s', np.sin), ('c', np.cos)):
+                quantities['ccorr_' + label_x + label_y] = \
+                    lambda start, stop, block, part_x=part_x, part_y=part_y: _block_cross(
+                        part_x(np.angle(x[..., start:stop])), part_y(np.angle(y[..., start:stop])), block)
+        for label, values in (('x', x), ('y', y)):
+            for part_label, part in (('s', lambda angle: np.sin(angle)),
+                                     ('c', lambda angle: np.cos(angle)),
+                                     ('ss', lambda angle: np.sin(angle) ** 2),
+                                     ('sc', lambda angle: np.sin(2 * angle) / 2),
+                                     ('cc', lambda angle: np.cos(angle) ** 2)):
+                quantities['ccorr_' + part_label + '_' + label] = \
+                    lambda start, stop, block, values=values, part=part: _block_sum(
+                        part(np.angle(values[..., start:stop])), block)
+    if set(names) & {'pli', 'wpli', 'wpli2_debiased'}:
+        # sign and absolute value are not bilinear: sum the products sample by sample
+        quantities['sign'] = lambda start, stop, block: _block_sum(
+            np.sign(imag_cross(start, stop)), block)
+        quantities['imag'] = lambda start, stop, block: _block_cross(
+            np.imag(x[..., start:stop]), np.real(y[..., start:stop]), block) - _block_cross(
+            np.real(x[..., start:stop]), np.imag(y[..., start:stop]), block)
+        quantities['abs'] = lambda start, stop, block: _block_sum(
+            np.abs(imag_cross(start, stop)), block)
+        quantities['sq'] = lambda start, stop, block: _block_sum(
+            imag_cross(start, stop) ** 2, block)
+
+    sums = _windowed_sums(quantities, x.shape[-1], window, hop, chunk_size)
+
+    def outer(values_x, values_y):
+        return values_x[..., :, np.newaxis] * values_y[..., np.newaxis, :]
+
+    cons = {}
+    for mode, name in zip(modes, names):
+        if name == 'plv':
+            con = np.abs(sums['plv']) / window
+
+        elif name in ('coh', 'imaginary_coh'):
+            cross = sums['cross'] if name == 'coh' else np.imag(sums['cross'])
+            con = np.abs(cross) / np.sqrt(outer(sums['pow_x'], sums['pow_y']))
+
+        elif name in ('envelope_corr', 'pow_corr'):
+            cov = sums[name + '_xy'] - outer(sums[name + '_x'], sums[name + '_y']) / window
+            var_x = sums[name + '_xx'] - sums[name + '_x'] ** 2 / window
+            var_y = sums[name + '_yy'] - sums[name + '_y'] ** 2 / window
+            con = cov / np.sqrt(outer(var_x, var_y))
+
+        elif name == 'ccorr':
+            # sin(a - mu) = sin(a) cos(mu) - cos(a) sin(mu), mu being the circular mean of the window
+            mu_x = np.arctan2(sums['ccorr_s_x'], sums['ccorr_c_x'])
+            mu_y = np.arctan2(sums['ccorr_s_y'], sums['ccorr_c_y'])
+            num = outer(np.cos(mu_x), np.cos(mu_y)) * sums['ccorr_ss'] - \
+                outer(np.cos(mu_x), np.sin(mu_y)) * sums['ccorr_sc'] - \
+                outer(np.sin(mu_x), np.cos(mu_y)) * sums['ccorr_cs'] + \
+                outer(np.sin(mu_x), np.sin(mu_y)) * sums['ccorr_cc']
+            den = [np.cos(mu) ** 2 * sums['ccorr_ss_' + label] -
+                   2 * np.sin(mu) * np.cos(mu) * sums['ccorr_sc_' + label] +
+                   np.sin(mu) ** 2 * sums['ccorr_cc_' + label]
+                   for label, mu in (('x', mu_x), ('y', mu_y))]
+            con = np.abs(num / np.sqrt(outer(den[0], den[1])))
+
+        elif name == 'pli':
+            con = np.abs(sums['sign']) / window
+
+        elif name == 'wpli':
+            con_num = np.abs(sums['imag'])
+            con_den = sums['abs'].copy()
+            con_den[con_den == 0] = 1
+            con = con_num / con_den
+
+        else:
+            con_num = sums['imag'] ** 2 - sums['sq']
+            con_den = sums['abs'] ** 2 - sums['sq']
+            con_den[con_den == 0] = 1
+            con = con_num / con_den
+
+        cons[mode] = con
+
+    return cons
+
+
+def compute_sync_windowed(complex_signal: np.ndarray, mode: Union[str, list], window: int, hop: int,
+                          blocks: str = 'all', chunk_size: int = 64) -> Union[np.ndarray, dict]:
+    """
+    Computes time-resolved connectivity over sliding windows of continuous
+    analytic signals.
+
+    The analytic signal is computed once per continuous segment (e.g. with
+    compute_freq_bands on the whole recording) instead of once per window.
+    The windowed measures are then derived from cumulative sums over blocks
+    of gcd(window, hop) samples, so the cost is linear in the recording
+    length instead of proportional to the number of windows times the
+    window length.
+
+    Arguments:
+
+        complex_signal:
+            shape = (2, n_segments, n_channels, n_freq_bins, n_times).
+            Analytic signals of continuous segments for two participants.
+
+        mode:
+            Connectivity measure or list of measures, see compute_sync.
+
+        window:
+            window length in samples.
+
+        hop:
+            number of samples between the starts of two consecutive windows.
+
+        blocks:
+            connectivity blocks to compute: 'all' (default), 'inter' or 'intra'.
+            See compute_sync.
+
+        chunk_size:
+            number of samples processed at once (default: 64).
+
+    Returns:
+        con:
+            Connectivity matrices of shape
+            (n_freq, n_segments, n_windows, 2*n_channels, 2*n_channels),
+            with the same block conventions as compute_sync. Window w spans
+            the samples [w * hop, w * hop + window). A dictionary is returned
+            if mode is a list.
+
+            Each window gives the same value as compute_sync on the
+            corresponding slice of complex_signal.
+    """
+    modes = [mode] if isinstance(mode, str) else list(mode)
+    pairs = _block_signals(complex_signal, blocks)
+    cons = [_compute_sync_windowed_block(x, y, modes, window, hop, chunk_size) for x, y in pairs]
+    if blocks == 'intra':
+        cons = {m: np.array([cons_participant[m] for cons_participant in cons]) for m in modes}
     else:
-        ValueError('Metric type not supported.')
+        cons = cons[0]
 
-    con = con.swapaxes(0, 1)  # n_freq x n_epoch x 2*n_ch x 2*n_ch
-    if epochs_average:
-        con = np.nanmean(con, axis=1)
+    # n_freq x n_segments x n_windows x n_ch x n_ch
+    cons = {m: con.swapaxes(-5, -4) for m, con in cons.items()}
 
-    return con
+    if isinstance(mode, str):
+        return cons[mode]
+    return cons
 
 
 def compute_conn_mvar(complex_signal: np.ndarray, mvar_params: dict, ica_params: dict, measure_params: dict, check_stability: bool = True) -> np.ndarray:
@@ -642,7 +1770,9 @@ def compute_conn_mvar(complex_signal: np.ndarray, mvar_params: dict, ica_params:
         return np.asarray(aux_3, dtype=d_type)
 
 
-def compute_single_freq(data: np.ndarray, sampling_rate: int, freq_range: list) -> np.ndarray:
+def compute_single_freq(data: np.ndarray, sampling_rate: int, freq_range: list,
+                        dtype: np.dtype = np.complex128, n_jobs: int = 1,
+                        average: str = None, decim: int = 1, max_memory: float = 1e9) -> np.ndarray:
     """
     Computes analytic signal per frequency bin using the multitaper method.
 
@@ -655,23 +1785,176 @@ def compute_single_freq(data: np.ndarray, sampling_rate: int, freq_range: list)
         freq_range:
             a list of two specifying the frequency range.
             e.g. [5,30] refers to every integer in the frequency bin from 5 Hz to 30 Hz.
+        dtype:
+            complex dtype of the returned analytic signal (default: np.complex128).
+            Each participant's transform is cast as soon as it is computed.
+        n_jobs:
+            number of jobs for mne.time_frequency.tfr_array_multitaper (default: 1).
+        average:
+            None (default) to return every taper and frequency, 'tapers' to
+            return the mean over tapers, or 'band' to return the mean over
+            tapers and frequencies. With 'tapers' and 'band', frequencies are
+            transformed in batches and averaged as they are computed, so
+            that the full (tapers, frequencies) transform is never held in
+            memory.
+        decim:
+            decimation factor applied to the time axis of the transform,
+            int (default: 1).
+        max_memory:
+            memory budget in bytes of the transform of one batch of
+            frequencies, with average set (default: 1e9). Larger batches
+            share the FFT of the data between more frequencies.
     Returns:
         complex_signal:
-          shape is (2, n_epochs, n_channels, n_tapers, n_frequencies, n_times)
+          shape is (2, n_epochs, n_channels, n_tapers, n_frequencies, n_times),
+          (2, n_epochs, n_channels, n_frequencies, n_times) with average='tapers',
+          or (2, n_epochs, n_channels, 1, n_times) with average='band',
+          n_times being divided by decim.
+    """
+    freqs = np.arange(freq_range[0], freq_range[1], 1)
+    tfr_options = dict(sfreq=sampling_rate, n_cycles=4, zero_mean=False, use_fft=True, decim=decim,
+                       output='complex', n_jobs=n_jobs)
+
+    if average is None:
+        complex_signal = np.array([mne.time_frequency.tfr_array_multitaper(data[participant], freqs=freqs,
+                                                                           **tfr_options).astype(dtype, copy=False)
+                                   for participant in range(2)])
+        return complex_signal
+    if average not in ('tapers', 'band'):
+        raise ValueError("average should be None, 'tapers' or 'band'.")
+
+    complex_signal = None
+    for participant in range(2):
+        values = data[participant]
+        if isinstance(values, mne.BaseEpochs):
+            values = values.get_data()
+        n_epoch, n_ch, n_samp = np.shape(values)
+        if complex_signal is None:
+            n_times = len(range(0, n_samp, decim))
+            n_out = len(freqs) if average == 'tapers' else 1
+            complex_signal = np.zeros((2, n_epoch, n_ch, n_out, n_times), dtype=dtype)
+            # frequencies per call, the transform holding 3 tapers per frequency
+            freq_chunk = max(1, int(max_memory // (3 * n_epoch * n_ch * n_samp * 16)))
+        for start in range(0, len(freqs), freq_chunk):
+            # shape (n_epochs, n_channels, n_tapers, n_chunk_frequencies, n_times)
+            tfr = mne.time_frequency.tfr_array_multitaper(values, freqs=freqs[start:start + freq_chunk],
+                                                          **tfr_options)
+            tfr = np.mean(tfr, axis=2)
+            if average == 'tapers':
+                complex_signal[participant, :, :, start:start + freq_chunk] = tfr
+            else:
+                complex_signal[participant, :, :, 0] += tfr.sum(axis=2)
+    if average == 'band':
+        complex_signal /= len(freqs)
+
+    return complex_signal
+
+
+# helper function
+def _open_out_of_core(out: str, shape: tuple, dtype: np.dtype):
     """
+    Creates an on-disk array to write an analytic signal to.
 
-    complex_signal = np.array([mne.time_frequency.tfr_array_multitaper(data[participant], sfreq=sampling_rate,
-                                                                       freqs=np.arange(
-                                                                           freq_range[0], freq_range[1], 1),
-                                                                       n_cycles=4, zero_mean=False, use_fft=True,
-                                                                       decim=1,
-                                                                       output='complex')
-                               for participant in range(2)])
+    Arguments:
+        out: file name, HDF5 if it ends with '.h5' or '.hdf5', otherwise a
+            .npy file opened as a memory map.
+        shape: (2, n_epochs, n_channels, n_freq_bands, n_times).
+        dtype: complex dtype of the array.
 
+    Returns:
+        array: np.memmap or h5py.Dataset, chunked per epoch and band.
+    """
+    if str(out).endswith(('.h5', '.hdf5')):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError('h5py is required to write the analytic signal to HDF5.')
+        f = h5py.File(out, 'w')
+        return f.create_dataset('complex_signal', shape=shape, dtype=dtype,
+                                chunks=(2, 1, shape[2], 1, shape[4]))
+    return np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+
+
+# helper function
+def _fft_filter_bank(data: np.ndarray, sampling_rate: int, freq_bands: dict, filter_signal: bool = True,
+                     dtype: np.dtype = np.complex128, **filter_options) -> np.ndarray:
+    """
+    Helper function computing the analytic signal of all frequency bands
+    from a single forward FFT of the data, see compute_freq_bands.
+
+    Arguments:
+        data: real-valued data, shape (2, n_epochs, n_channels, n_times).
+        sampling_rate: sampling rate.
+        freq_bands: dictionary of frequency ranges.
+        filter_signal: whether to apply the band-pass filters.
+        dtype: complex dtype of the analytic signal.
+        **filter_options: arguments of mne.filter.create_filter (filter_length,
+            l_trans_bandwidth, h_trans_bandwidth, fir_window, fir_design),
+            n_jobs (FFT workers) and pad ('reflect_limited' or 'constant').
+
+    Returns:
+        complex_signal: array, shape (2, n_epochs, n_channels, n_freq_bands, n_times).
+
+    Note:
+        The data are padded on both sides by the longest filter length - 1
+        samples as mne.filter.filter_data does (point reflection about the
+        edge samples, limited to n_times - 1 samples, then zeros), then
+        transformed with one rFFT of a fast length. Each band is
+        the product of the spectrum with the zero-phase response of the FIR
+        filter designed by MNE and with the analytic-signal mask (negative
+        frequencies set to zero, positive ones doubled), followed by one
+        inverse FFT.
+    """
+    filter_options = dict(filter_options)
+    workers = filter_options.pop('n_jobs', None)
+    workers = None if workers in (None, 1) else workers
+    pad = filter_options.pop('pad', 'reflect_limited')
+    filter_options.pop('copy', None)
+    if filter_options.get('method', 'fir') != 'fir' or filter_options.get('phase', 'zero') != 'zero':
+        raise ValueError("The filter bank only supports zero-phase FIR filters (method='fir', phase='zero').")
+
+    n_samp = data.shape[-1]
+    filters = [mne.filter.create_filter(None, sampling_rate, l_freq=band[0], h_freq=band[1],
+                                        verbose=False, **filter_options) if filter_signal else np.ones(1)
+               for band in freq_bands.values()]
+    n_pad = max(len(h) for h in filters) - 1
+    n_fft = scipy.fft.next_fast_len(n_samp + 2 * n_pad, real=True)
+
+    real_dtype = np.finfo(dtype).dtype
+    padded = data.astype(real_dtype, copy=False)
+    if pad == 'reflect_limited':
+        # point reflection about the edge samples, then zeros, as in MNE
+        n_reflect = min(n_pad, n_samp - 1)
+        padded = np.pad(padded, [(0, 0)] * 3 + [(n_reflect, n_reflect)], mode='reflect', reflect_type='odd')
+    else:
+        n_reflect = 0
+    padded = np.pad(padded, [(0, 0)] * 3 + [(n_pad - n_reflect, n_pad - n_reflect)])
+    spectrum = scipy.fft.rfft(padded, n=n_fft, axis=-1, workers=workers)
+    del padded
+
+    # analytic-signal mask on the non-negative frequencies
+    freqs = scipy.fft.rfftfreq(n_fft, 1. / sampling_rate)
+    mask = np.full(len(freqs), 2.)
+    mask[0] = 1.
+    if n_fft % 2 == 0:
+        mask[-1] = 1.
+
+    complex_signal = np.empty(data.shape[:-1] + (len(freq_bands), n_samp), dtype=dtype)
+    # negative frequencies stay at zero, the buffer is reused across bands
+    band_spectrum = np.zeros(spectrum.shape[:-1] + (n_fft,), dtype=spectrum.dtype)
+    for band, h in enumerate(filters):
+        # zero-phase amplitude response of the linear-phase filter
+        _, response = signal.freqz(h, worN=freqs, fs=sampling_rate)
+        response = np.real(response * np.exp(1j * np.pi * freqs / sampling_rate * (len(h) - 1)))
+        np.multiply(spectrum, (mask * response).astype(real_dtype), out=band_spectrum[..., :len(freqs)])
+        complex_signal[..., band, :] = scipy.fft.ifft(band_spectrum, axis=-1,
+                                                      workers=workers)[..., n_pad:n_pad + n_samp]
     return complex_signal
 
 
-def compute_freq_bands(data: np.ndarray, sampling_rate: int, freq_bands: dict, filter_signal: bool = True , **filter_options) -> np.ndarray:
+def compute_freq_bands(data: np.ndarray, sampling_rate: int, freq_bands: dict, filter_signal: bool = True,
+                       dtype: np.dtype = np.complex128, out: str = None, epoch_chunk: int = 16,
+                       filter_bank: bool = False, **filter_options) -> np.ndarray:
     """
     Computes analytic signal per frequency band using FIR filtering
     and Hilbert transform.
@@ -688,15 +1971,60 @@ def compute_freq_bands(data: np.ndarray, sampling_rate: int, freq_bands: dict, f
         freq_bands:
             a dictionary specifying frequency band labels and corresponding frequency ranges
             e.g. {'alpha':[8,12], 'beta':[12,20]} indicates that computations are performed over two frequency bands: 8-12 Hz for the alpha band and 12-20 Hz for the beta band.
+        dtype:
+            complex dtype of the returned analytic signal (default: np.complex128).
+            With np.complex64, the filtered signal is cast to float32 before
+            the Hilbert transform, which is then computed in single precision.
+        out:
+            optional file name to write the analytic signal to instead of
+            keeping it in RAM, str. Files ending with '.h5' or '.hdf5' are
+            written with h5py (dataset 'complex_signal'), other names as a
+            .npy memory map. The signal is computed and written epoch_chunk
+            epochs and one band at a time. Defaults to None, in memory.
+        epoch_chunk:
+            number of epochs transformed at once when out is set (default: 16).
+        filter_bank:
+            if True, all bands are computed from a single forward FFT of the
+            data: the zero-phase responses of the FIR filters and the
+            analytic-signal mask are applied in the frequency domain, then
+            one inverse FFT is taken per band, instead of a FIR filtering and
+            a Hilbert transform per band and participant. Several times
+            faster with many bands; values match the default path up to the
+            filter edge effects. Only zero-phase FIR filters are supported.
+            Defaults to False.
         **filter_options:
-            additional arguments for mne.filter.filter_data, such as filter_length, l_trans_bandwidth, h_trans_bandwidth
+            additional arguments for mne.filter.filter_data, such as filter_length, l_trans_bandwidth, h_trans_bandwidth, n_jobs
     Returns:
         complex_signal: array, shape is
             (2, n_epochs, n_channels, n_freq_bands, n_times)
+            With out, an np.memmap or h5py.Dataset of that shape, which
+            compute_sync reads epoch_chunk epochs at a time. They can be
+            reopened later with np.load(out, mmap_mode='r') or
+            h5py.File(out)['complex_signal']. The HDF5 file stays open
+            until complex_signal.file.close() is called, which is needed
+            before writing to the same file again.
     """
     assert data[0].shape[0] == data[1].shape[0], "Two data streams should have the same number of trials."
     data = np.array(data)
 
+    if out is not None:
+        n_epoch, n_ch, n_samp = data.shape[1:]
+        complex_signal = _open_out_of_core(out, (2, n_epoch, n_ch, len(freq_bands), n_samp), dtype)
+        for e0 in range(0, n_epoch, epoch_chunk):
+            epochs = slice(e0, e0 + epoch_chunk)
+            bands = compute_freq_bands(data[:, epochs], sampling_rate, freq_bands, filter_signal,
+                                       dtype, filter_bank=filter_bank, **filter_options)
+            for band in range(len(freq_bands)):
+                complex_signal[:, epochs, :, band] = bands[:, :, :, band]
+        if isinstance(complex_signal, np.memmap):
+            complex_signal.flush()
+        else:
+            complex_signal.file.flush()
+        return complex_signal
+
+    if filter_bank:
+        return _fft_filter_bank(data, sampling_rate, freq_bands, filter_signal, dtype, **filter_options)
+
     # filtering and Hilbert transform
     complex_signal = []
     for freq_band in freq_bands.values():
@@ -710,7 +2038,7 @@ def compute_freq_bands(data: np.ndarray, sampling_rate: int, freq_bands: dict, f
                              ])
         else:
             filtered=np.array([data[participant] for participant in range(2)])
-        hilb = signal.hilbert(filtered)
+        hilb = signal.hilbert(filtered.astype(np.finfo(dtype).dtype, copy=False))
         complex_signal.append(hilb)
 
     complex_signal = np.moveaxis(np.array(complex_signal), [0], [3])
@@ -744,14 +2072,13 @@ def compute_nmPLV(data: np.ndarray, sampling_rate: int, freq_range1: list, freq_
     """
     r = np.mean(freq_range2)/np.mean(freq_range1)
     freq_range = [np.min(freq_range1), np.max(freq_range2)]
-    complex_signal = np.mean(compute_single_freq(data, sampling_rate, freq_range, **filter_options),3).squeeze()
+    complex_signal = compute_single_freq(data, sampling_rate, freq_range, average='tapers', **filter_options).squeeze()
 
     n_epoch, n_ch, n_freq, n_samp = complex_signal.shape[1], complex_signal.shape[2], \
                                     complex_signal.shape[3], complex_signal.shape[4]
 
     # calculate all epochs at once, the only downside is that the disk may not have enough space
     complex_signal = complex_signal.transpose((1, 3, 0, 2, 4)).reshape(n_epoch, n_freq, 2 * n_ch, n_samp)
-    transpose_axes = (0, 1, 3, 2)
     phase = complex_signal / np.abs(complex_signal)
 
     freqsn = freq_range
@@ -762,16 +2089,218 @@ def compute_nmPLV(data: np.ndarray, sampling_rate: int, freq_range1: list, freq_
     phase[:, :, :, :n_ch] = n_mult * phase[:, :, :, :n_ch]
     phase[:, :, :, n_ch:] = m_mult * phase[:, :, :, n_ch:]
 
-    c = np.real(phase)
-    s = np.imag(phase)
-    dphi = _multiply_conjugate(c, s, transpose_axes=transpose_axes)
+    dphi = _cross_spectrum(phase)
     con = abs(dphi) / n_samp
     con = np.nanmean(con, axis=1)
     return con
 
 
+def compute_nmPLV_matrix(data: np.ndarray, sampling_rate: int, freq_range: list, epochs_average: bool = True,
+                         dtype: np.dtype = np.complex128, decim: int = 1, n_jobs: int = 1) -> np.ndarray:
+    """
+    Computes inter-brain n:m phase locking between every pair of
+    frequencies of a grid, from a single multitaper transform.
+
+    Arguments:
+        data:
+            shape is (2, n_epochs, n_channels, n_times)
+            real-valued data to compute analytic signal from.
+        sampling_rate:
+            sampling rate.
+        freq_range:
+            a list of two specifying the frequency grid, every integer
+            frequency from freq_range[0] (included) to freq_range[1]
+            (excluded), as in compute_single_freq.
+        epochs_average:
+            whether to average the phase locking over epochs, boolean.
+        dtype:
+            complex dtype of the analytic signal (default: np.complex128).
+        decim:
+            decimation factor of the transform, int (default: 1).
+        n_jobs:
+            number of jobs for the multitaper transform (default: 1).
+
+    Returns:
+        con:
+            n:m phase locking values, shape (n_freq, n_freq, n_epochs,
+            n_channels, n_channels), or (n_freq, n_freq, n_channels,
+            n_channels) if epochs_average is True. con[i, j] couples the
+            channels of participant 1 at frequency i (rows) with those of
+            participant 2 at frequency j (columns).
+
+    Note:
+        For frequencies f1 and f2, with g their greatest common divisor,
+        n = f2 / g and m = f1 / g are the smallest integers such that
+        n * f1 = m * f2, and the phase locking value is
+        |mean_t exp(i (n * phase1 - m * phase2))| (Tass et al., 1998).
+        The diagonal (n = m = 1) is the inter-brain PLV.
+        The analytic signal (averaged over tapers) is computed once for the
+        whole grid. For each f1, the coupling with all f2 is computed at
+        once as a batched product of (f2, epoch, channel, time) phasors.
+    """
+    freqs = np.arange(freq_range[0], freq_range[1], 1)
+    complex_signal = compute_single_freq(data, sampling_rate, freq_range, dtype=dtype, n_jobs=n_jobs,
+                                         average='tapers', decim=decim)
+    # phases, shape (n_freq, n_epochs, n_channels, n_times) per participant
+    phase1 = np.angle(complex_signal[0]).transpose((2, 0, 1, 3))
+    phase2 = np.angle(complex_signal[1]).transpose((2, 0, 1, 3))
+    del complex_signal
+    n_samp = phase1.shape[-1]
+
+    freqs_int = np.round(freqs).astype(int)
+    if not np.allclose(freqs, freqs_int):
+        raise ValueError('freq_range should define integer frequencies.')
+    con = []
+    for i, f1 in enumerate(freqs_int):
+        g = np.gcd(f1, freqs_int)
+        n = (freqs_int // g).astype(phase1.dtype)[:, np.newaxis, np.newaxis, np.newaxis]
+        m = (f1 // g).astype(phase1.dtype)[:, np.newaxis, np.newaxis, np.newaxis]
+        # exp(i * n * phase1) for every f2, and exp(i * m * phase2) at f2
+        x = np.exp(1j * n * phase1[i]).astype(dtype, copy=False)
+        y = np.exp(1j * m * phase2).astype(dtype, copy=False)
+        con.append(np.abs(_cross_spectrum(x, y)) / n_samp)
+    con = np.array(con)  # n_freq x n_freq x n_epoch x n_ch x n_ch
+
+    if epochs_average:
+        con = np.nanmean(con, axis=2)
+    return con
+
+
+# number of complex values of a chunk of channel pairs in xwt
+_XWT_CHUNK_ELEMENTS = 2 ** 24
+
+
+# helper function
+def _smooth_wavelet(values: np.ndarray, freqs: np.ndarray, n_cycles: Union[float, np.ndarray], sfreq: float,
+                    scale_width: float = 0.6) -> np.ndarray:
+    """
+    Helper function smoothing wavelet spectra in time and scale, as needed
+    by the wavelet coherence (Torrence & Webster, 1999; Grinsted et al., 2004).
+
+    Arguments:
+        values: real or complex spectra, shape (..., n_freqs, n_times).
+        freqs: frequencies of the wavelets.
+        n_cycles: number of cycles of the Morlet wavelets.
+        sfreq: sampling frequency.
+        scale_width: width of the boxcar over scales, in octaves (default:
+            0.6, the decorrelation length of the Morlet wavelet).
+
+    Returns:
+        smoothed: array of the same shape and kind as values.
+
+    Note:
+        In time, each frequency is convolved with a Gaussian of the standard
+        deviation of its wavelet, n_cycles / (2 * pi * f), as a product with
+        the Gaussian's transfer function after one FFT of all the spectra,
+        zero-padded by 4 standard deviations. Across scales, each frequency
+        is averaged with the frequencies within scale_width / 2 octaves,
+        as a product with an (n_freqs, n_freqs) averaging matrix.
+    """
+    n_times = values.shape[-1]
+    sigmas = np.broadcast_to(n_cycles, freqs.shape) / (2 * np.pi * freqs) * sfreq
+    n_fft = scipy.fft.next_fast_len(n_times + int(np.ceil(4 * sigmas.max())))
+    if np.iscomplexobj(values):
+        nu = scipy.fft.fftfreq(n_fft)
+        spectrum = scipy.fft.fft(values, n=n_fft, axis=-1)
+    else:
+        nu = scipy.fft.rfftfreq(n_fft)
+        spectrum = scipy.fft.rfft(values, n=n_fft, axis=-1)
+    spectrum *= np.exp(-2 * np.pi ** 2 * sigmas[:, np.newaxis] ** 2 * nu ** 2)
+
+    octaves = np.abs(np.log2(freqs[:, np.newaxis] / freqs[np.newaxis, :]))
+    weights = (octaves <= scale_width / 2 + 1e-12).astype(float)
+    weights /= weights.sum(axis=1, keepdims=True)
+    spectrum = np.matmul(weights, spectrum)
+
+    if np.iscomplexobj(values):
+        return scipy.fft.ifft(spectrum, axis=-1)[..., :n_times]
+    return scipy.fft.irfft(spectrum, n=n_fft, axis=-1)[..., :n_times]
+
+
+# helper function
+def _cwt_channels(data: np.ndarray, Ws: list) -> np.ndarray:
+    """
+    Helper function computing the Morlet CWT of every channel and epoch
+    with a single call to mne.time_frequency.tfr.cwt.
+
+    Arguments:
+        data: signals, shape (n_epochs, n_channels, n_times).
+        Ws: wavelets from mne.time_frequency.morlet.
+
+    Returns:
+        tfr: complex array, shape (n_channels, n_epochs, n_freqs, n_times).
+    """
+    n_epochs, n_chans, n_samples = data.shape
+    tfr = mne.time_frequency.tfr.cwt(data.reshape(n_epochs * n_chans, n_samples), Ws, use_fft=True,
+                                     mode='same', decim=1)
+    return tfr.reshape(n_epochs, n_chans, len(Ws), n_samples).swapaxes(0, 1)
+
+
+# helper function
+def _xwt_blocks(data1: np.ndarray, data2: np.ndarray, freqs: np.ndarray, n_cycles: Union[float, np.ndarray],
+                sfreq: float, mode: str, average: list, decim: int = 1):
+    """
+    Helper generator computing xwt for chunks of sig1 channels against all
+    sig2 channels, with the reductions applied to each chunk.
+
+    Arguments:
+        data1, data2: signals, shape (n_epochs, n_channels, n_times).
+        freqs: frequencies of the wavelets.
+        n_cycles: number of cycles of the Morlet wavelets.
+        sfreq: sampling frequency.
+        mode: 'power', 'phase', 'xwt' or 'wtc', see xwt.
+        average: list of averaged dimensions, see xwt.
+        decim: decimation factor of the time dimension.
+
+    Yields:
+        rows: slice of the sig1 channels of the block.
+        block: results of shape (rows, n_chans2, n_epochs, n_freqs, n_times),
+            without the averaged dimensions.
+    """
+    n_epochs, n_chans1, n_samples = data1.shape
+    n_chans2 = data2.shape[1]
+    n_freqs = len(freqs)
+
+    # Set the mother wavelet
+    Ws = mne.time_frequency.morlet(sfreq, freqs,
+                                   n_cycles=n_cycles, sigma=None, zero_mean=True)
+
+    # Perform a continuous wavelet transform on all epochs of each channel, once
+    out1 = _cwt_channels(data1, Ws)
+    out2 = _cwt_channels(data2, Ws)
+    if mode == 'wtc':
+        # spectra divided by the scale, which is proportional to 1 / f
+        scale_weights = freqs[:, np.newaxis]
+        smooth_wps1 = _smooth_wavelet(np.abs(out1) ** 2 * scale_weights, freqs, n_cycles, sfreq)
+        smooth_wps2 = _smooth_wavelet(np.abs(out2) ** 2 * scale_weights, freqs, n_cycles, sfreq)
+
+    # axes of a block, in decreasing order so that removing one keeps the others
+    axes = [axis for name, axis in (('time', 4), ('band', 3), ('epochs', 2)) if name in average]
+
+    # Compute cross-spectra for chunks of sig1 channels against all sig2 channels
+    n_rows = max(1, _XWT_CHUNK_ELEMENTS // (n_chans2 * n_epochs * n_freqs * n_samples))
+    for start in range(0, n_chans1, n_rows):
+        rows = slice(start, min(start + n_rows, n_chans1))
+        # shape (rows, n_chans2, n_epochs, n_freqs, n_samples)
+        block = out1[rows, np.newaxis] * out2[np.newaxis].conj()
+        if mode == 'wtc':
+            smooth_cross = _smooth_wavelet(block * scale_weights, freqs, n_cycles, sfreq)
+            block = np.abs(smooth_cross) ** 2 / (smooth_wps1[rows, np.newaxis] * smooth_wps2[np.newaxis])
+        elif mode == 'power':
+            block = np.abs(block)
+        if 'time' not in average and decim > 1:
+            block = block[..., ::decim]
+        for axis in axes:
+            block = block.mean(axis=axis)
+        if mode == 'phase':
+            block = np.angle(block)
+        yield rows, block
+
+
 def xwt(sig1: mne.Epochs, sig2: mne.Epochs,
-        freqs: Union[int, np.ndarray], n_cycles=5.0, mode: str = "xwt") -> np.ndarray:
+        freqs: Union[int, np.ndarray], n_cycles=5.0, mode: str = "xwt",
+        average: Union[str, list] = None, decim: int = 1, out: str = None,
+        generator: bool = False) -> np.ndarray:
     """
     Performs a cross wavelet transform on two signals.
 
@@ -787,67 +2316,259 @@ def xwt(sig1: mne.Epochs, sig2: mne.Epochs,
             Range of frequencies of interest in Hz.
 
         mode: str
-            Sets the type of analyses.
+            Sets the type of analyses: 'xwt' (cross wavelet transform),
+            'power' (its modulus), 'phase' (its angle) or 'wtc' (wavelet
+            coherence).
+
+        average: str | list
+            Dimensions averaged during the computation, any of 'epochs',
+            'band' (frequencies) and 'time', e.g. ['epochs', 'time'].
+            Averaged dimensions are removed from the output. For 'phase',
+            the angle of the averaged cross wavelet transform is returned.
+            Defaults to None, no averaging.
+
+        decim: int
+            Decimation factor of the time dimension of the output, applied
+            after the transform and the coherence smoothing (default: 1).
+
+        out: str
+            Optional .npy file name: the output is written to a memory map
+            instead of being held in RAM. Defaults to None.
+
+        generator: bool
+            If True, a generator is returned that yields (rows, data)
+            tuples, rows being a slice of sig1 channels and data their
+            results against all sig2 channels, one block of channel pairs
+            at a time. Defaults to False.
 
     Note:
         This function relies on MNE's mne.time_frequency.morlet
         and mne.time_frequency.tfr.cwt functions.
+
+        The wavelet coherence is the squared coherence of Torrence &
+        Webster (1999) and Grinsted et al. (2004),
+        |S(W_xy / s)|^2 / (S(|W_x|^2 / s) S(|W_y|^2 / s)), with s the scale
+        and S a smoothing in time (Gaussian of the wavelet's width) and
+        scale (boxcar of 0.6 octave). It lies between 0 and 1. The smoothing
+        is computed with FFTs, for all channel pairs and epochs at once.
     
     Returns:
         data:
-            Wavelet results. The shape is (n_chans1, n_chans2, n_epochs, n_freqs, n_samples).
-            Wavelet transform coherence calculated according to Maraun & Kurths (2004)
+            Wavelet results. The shape is (n_chans1, n_chans2, n_epochs, n_freqs, n_samples),
+            without the averaged dimensions and with n_samples divided by decim.
+            An np.memmap if out is set, a generator of blocks if generator is True.
     """
     
+    if mode not in ('power', 'phase', 'xwt', 'wtc'):
+        data = 'Please specify a valid mode: power, phase, xwt, or wtc.'
+        print(data)
+        return data
+    average = [] if average is None else [average] if isinstance(average, str) else list(average)
+    if set(average) - {'epochs', 'band', 'time'}:
+        raise ValueError("average should contain 'epochs', 'band' or 'time'.")
+
     # Set parameters for the output
     n_freqs = len(freqs)
     sfreq = sig1.info['sfreq']
     assert sig1.info['sfreq'] == sig2.info['sfreq'], "Sig1 et sig2 should have the same sfreq value."
 
-    n_epochs1, n_chans1, n_samples1 = sig1.get_data().shape
-    n_epochs2, n_chans2, n_samples2 = sig2.get_data().shape
+    data1 = sig1.get_data()
+    data2 = sig2.get_data()
+    n_epochs1, n_chans1, n_samples1 = data1.shape
+    n_epochs2, n_chans2, n_samples2 = data2.shape
 
     assert n_epochs1 == n_epochs2, "n_epochs1 and n_epochs2 should have the same number of epochs."
     assert n_chans1 == n_chans2, "n_chans1 and n_chans2 should have the same number of channels."
     assert n_samples1 == n_samples2, "n_samples1 and n_samples2 should have the same number of samples."
 
-    cross_sigs = np.zeros((n_chans1, n_chans2, n_epochs1, n_freqs, n_samples1), dtype=complex) * np.nan
-    wcts = np.zeros((n_chans1, n_chans2, n_epochs1, n_freqs, n_samples1), dtype=complex) * np.nan
+    blocks = _xwt_blocks(data1, data2, np.asarray(freqs, dtype=float), n_cycles, sfreq, mode, average, decim)
+    if generator:
+        return blocks
+
+    # Output shape after reductions
+    shape = [n_chans1, n_chans2]
+    if 'epochs' not in average:
+        shape.append(n_epochs1)
+    if 'band' not in average:
+        shape.append(n_freqs)
+    if 'time' not in average:
+        shape.append(len(range(0, n_samples1, decim)))
+    dtype = complex if mode == 'xwt' else float
+    if out is None:
+        data = np.empty(shape, dtype=dtype)
+    else:
+        data = np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=tuple(shape))
+    for rows, block in blocks:
+        data[rows] = block
+    if out is not None:
+        data.flush()
+    return data
+
 
-    # Set the mother wavelet
-    Ws = mne.time_frequency.tfr.morlet(sfreq, freqs, 
-                                       n_cycles=n_cycles, sigma=None, zero_mean=True)
-
-    # Perform a continuous wavelet transform on all epochs of each signal
-    for ind1, ch_label1 in enumerate(sig1.ch_names):
-        for ind2, ch_label2 in enumerate(sig2.ch_names):
-            # Extract the channel's data for both participants and apply cwt
-            cur_sig1 = np.squeeze(sig1.get_data(mne.pick_channels(sig1.ch_names, [ch_label1])))
-            out1 = mne.time_frequency.tfr.cwt(cur_sig1, Ws, use_fft=True,
-                                              mode='same', decim=1)
-            cur_sig2 = np.squeeze(sig2.get_data(mne.pick_channels(sig2.ch_names, [ch_label2])))
-            out2 = mne.time_frequency.tfr.cwt(cur_sig2, Ws, use_fft=True,
-                                              mode='same', decim=1)
-            
-            # Compute cross-spectrum
-            wps1 = out1 * out1.conj()
-            wps2 = out2 * out2.conj()
-            cross_sig = out1 * out2.conj()
-            cross_sigs[ind1, ind2, :, :, :] = cross_sig
-            coh = (cross_sig) / (np.sqrt(wps1*wps2))
-            abs_coh = np.abs(coh)
-            wct = (abs_coh - np.min(abs_coh)) / (np.max(abs_coh) - np.min(abs_coh))
-            wcts[ind1, ind2, :, :, :] = wct
-
-    if mode == 'power':
-        data = np.abs(cross_sigs)
-    elif mode == 'phase':
-        data = np.angle(cross_sigs)
-    elif mode == 'xwt':
-        data = cross_sigs
-    elif mode == 'wtc':
-        data = wcts 
+# helper function
+def _ar1_params(data: np.ndarray) -> tuple:
+    """
+    Helper function fitting an AR(1) model to each channel.
+
+    Arguments:
+        data: signals, shape (n_epochs, n_channels, n_times).
+
+    Returns:
+        coefs: lag-1 autoregressive coefficient of each channel.
+        stds: standard deviation of each channel.
+    """
+    data = data - data.mean(axis=-1, keepdims=True)
+    coefs = np.sum(data[..., 1:] * data[..., :-1], axis=(0, 2)) / np.sum(data[..., :-1] ** 2, axis=(0, 2))
+    return np.clip(coefs, -0.999, 0.999), data.std(axis=(0, 2))
+
+
+# helper function
+def _surrogates(data: np.ndarray, n_surrogates: int, surrogate: str, rng: np.random.Generator,
+                ar1: tuple = None) -> np.ndarray:
+    """
+    Helper function generating surrogates of every epoch and channel,
+    independently across channels.
+
+    Arguments:
+        data: signals, shape (n_epochs, n_channels, n_times).
+        n_surrogates: number of surrogates.
+        surrogate: 'ar1' for red noise with the AR(1) coefficient and
+            variance of each channel, 'phase' for phase-randomized copies
+            of the data, with the same amplitude spectrum.
+        rng: random generator.
+        ar1: (coefs, stds) from _ar1_params, for 'ar1'.
+
+    Returns:
+        surrogates: array of shape (n_surrogates * n_epochs, n_channels, n_times),
+            surrogate-major.
+    """
+    n_epochs, n_chans, n_times = data.shape
+    if surrogate == 'phase':
+        spectrum = scipy.fft.rfft(data, axis=-1)
+        phases = rng.uniform(0, 2 * np.pi, (n_surrogates,) + spectrum.shape)
+        # the DC and Nyquist terms stay real
+        phases[..., 0] = 0
+        if n_times % 2 == 0:
+            phases[..., -1] = 0
+        surrogates = scipy.fft.irfft(spectrum * np.exp(1j * phases), n=n_times, axis=-1)
     else:
-        data = 'Please specify a valid mode: power, phase, xwt, or wtc.'
-        print(data)
-    return data
\ No newline at end of file
+        coefs, stds = ar1
+        noise = rng.standard_normal((n_surrogates, n_epochs, n_chans, n_times))
+        surrogates = np.empty_like(noise)
+        for ch in range(n_chans):
+            # stationary start: x[-1] ~ N(0, std ** 2)
+            zi = coefs[ch] * stds[ch] * rng.standard_normal((n_surrogates, n_epochs, 1))
+            surrogates[:, :, ch], _ = signal.lfilter([1.], [1., -coefs[ch]],
+                                                     noise[:, :, ch] * stds[ch] * np.sqrt(1 - coefs[ch] ** 2),
+                                                     axis=-1, zi=zi)
+    return surrogates.reshape(n_surrogates * n_epochs, n_chans, n_times)
+
+
+# helper function
+def _xwt_surrogate_counts(data1: np.ndarray, data2: np.ndarray, observed: np.ndarray, seeds: list,
+                          batch_size: int, freqs: np.ndarray, n_cycles: Union[float, np.ndarray], sfreq: float,
+                          mode: str, average: list, decim: int, surrogate: str) -> np.ndarray:
+    """
+    Helper function run by the workers of xwt_significance: counts, for
+    each pixel, the surrogates at least as large as the observed value.
+
+    Arguments:
+        data1, data2: signals, shape (n_epochs, n_channels, n_times).
+        observed: observed xwt results, see xwt.
+        seeds: one np.random.SeedSequence per batch of surrogates.
+        batch_size: number of surrogates transformed at once.
+        freqs, n_cycles, sfreq, mode, average, decim: see xwt.
+        surrogate: 'ar1' or 'phase', see _surrogates.
+
+    Returns:
+        counts: integer array of the shape of observed.
+    """
+    n_epochs = data1.shape[0]
+    ar1 = (_ar1_params(data1), _ar1_params(data2)) if surrogate == 'ar1' else (None, None)
+    # epochs are averaged after the blocks are split per surrogate
+    block_average = [name for name in average if name != 'epochs']
+    counts = np.zeros(observed.shape, dtype=np.int64)
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        surr1 = _surrogates(data1, batch_size, surrogate, rng, ar1[0])
+        surr2 = _surrogates(data2, batch_size, surrogate, rng, ar1[1])
+        for rows, block in _xwt_blocks(surr1, surr2, freqs, n_cycles, sfreq, mode, block_average, decim):
+            # shape (rows, n_chans2, n_surrogates, n_epochs, ...)
+            block = block.reshape(block.shape[:2] + (batch_size, n_epochs) + block.shape[3:])
+            if 'epochs' in average:
+                block = block.mean(axis=3)
+            counts[rows] += np.sum(block >= observed[rows][:, :, np.newaxis], axis=2)
+    return counts
+
+
+def xwt_significance(sig1: mne.Epochs, sig2: mne.Epochs, freqs: np.ndarray, n_cycles=5.0,
+                     mode: str = 'wtc', n_surrogates: int = 1000, surrogate: str = 'ar1',
+                     average: Union[str, list] = None, decim: int = 1, batch_size: int = 20,
+                     n_jobs: int = 1, seed: int = None) -> tuple:
+    """
+    Estimates the significance of cross wavelet results with Monte-Carlo
+    surrogates.
+
+    Arguments:
+        sig1, sig2: mne.Epochs
+            Signals of the two participants, see xwt.
+        freqs: np.ndarray
+            Frequencies of interest in Hz.
+        n_cycles:
+            number of cycles of the Morlet wavelets (default: 5.0).
+        mode: str
+            'wtc' (default) or 'power', see xwt.
+        n_surrogates: int
+            number of surrogate pairs (default: 1000), rounded up to a
+            multiple of batch_size.
+        surrogate: str
+            - 'ar1' (default): red noise with the lag-1 autocorrelation and
+              variance of each channel (Torrence & Compo, 1998; Grinsted
+              et al., 2004).
+            - 'phase': phase-randomized copies of each epoch and channel,
+              which keep their amplitude spectrum.
+            Surrogates are drawn independently for each channel.
+        average, decim:
+            reductions of the results, see xwt.
+        batch_size: int
+            number of surrogates transformed together, their epochs being
+            concatenated (default: 20).
+        n_jobs: int
+            number of worker processes, -1 uses all cores (default: 1).
+        seed: int
+            seed of the random generators (default: None).
+
+    Returns:
+        result: namedtuple with
+          - data: the observed xwt results, as returned by xwt.
+          - pvalues: per-pixel p-values of the same shape,
+            (1 + number of surrogates >= data) / (1 + n_surrogates).
+
+    Note:
+        Each batch of surrogates draws from its own random stream, spawned
+        from np.random.SeedSequence(seed), so results do not depend on
+        n_jobs. Batches are split between the workers of a process pool,
+        each returning its exceedance counts.
+    """
+    if mode not in ('wtc', 'power'):
+        raise ValueError("mode should be 'wtc' or 'power'.")
+    if surrogate not in ('ar1', 'phase'):
+        raise ValueError("surrogate should be 'ar1' or 'phase'.")
+    average = [] if average is None else [average] if isinstance(average, str) else list(average)
+
+    observed = xwt(sig1, sig2, freqs, n_cycles=n_cycles, mode=mode, average=average, decim=decim)
+    data1 = sig1.get_data()
+    data2 = sig2.get_data()
+    freqs = np.asarray(freqs, dtype=float)
+
+    n_batches = int(np.ceil(n_surrogates / batch_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    parallel, p_fun, n_jobs = mne.parallel.parallel_func(_xwt_surrogate_counts, n_jobs, prefer='processes',
+                                                         max_jobs=n_batches, verbose=False)
+    counts = parallel(p_fun(data1, data2, observed, list(worker_seeds), batch_size, freqs, n_cycles,
+                            sig1.info['sfreq'], mode, average, decim, surrogate)
+                      for worker_seeds in np.array_split(np.array(seeds, dtype=object), n_jobs))
+    pvalues = (1 + np.sum(counts, axis=0)) / (1 + n_batches * batch_size)
+
+    significance_tuple = namedtuple('xwt_significance', ['data', 'pvalues'])
+    return significance_tuple(data=observed, pvalues=pvalues)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+LRU cache of analytic-signal transforms
+
+| Option | Description |
+| ------ | ----------- |
+| title           | cache.py |
+| date            | 2026-10-17 |
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def fingerprint(data: np.ndarray) -> str:
+    """
+    Computes a fast hash of an array, its shape and its dtype.
+
+    Arguments:
+        data: array, or list of arrays of the same shape (e.g. one per participant).
+
+    Returns:
+        digest: hexadecimal BLAKE2b digest, 32 characters.
+    """
+    data = np.ascontiguousarray(data)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((data.shape, data.dtype.str)).encode())
+    h.update(memoryview(data).cast('B'))
+    return h.hexdigest()
+
+
+class TransformCache:
+    """
+    Memoizes transforms such as compute_freq_bands and compute_single_freq,
+    keyed on a fingerprint of the input data and on the other arguments.
+
+    Arguments:
+        max_memory: maximum number of bytes of results held in memory
+            (default: 1e9).
+        max_disk: maximum number of bytes of results saved in cache_dir
+            (default: 0, no disk cache).
+        cache_dir: directory of the disk cache, required when max_disk > 0.
+            Results already in it are reused across sessions.
+
+    Note:
+        Both levels evict the least recently used results first. Results
+        evicted from memory are moved to disk when the disk cache is
+        enabled, and results read from disk are moved back to memory.
+        Results larger than a budget are not stored at that level.
+        Returned arrays are read-only since they are shared between calls.
+
+        Example:
+            cache = TransformCache(max_memory=4e9)
+            for mode in ['plv', 'ccorr']:
+                pair_connectivity(data, 500, {'alpha': [8, 12]}, mode, cache=cache)
+        computes the analytic signal of the alpha band only once.
+    """
+
+    # arguments that do not change the result
+    ignored = ('n_jobs', 'verbose')
+
+    def __init__(self, max_memory: float = 1e9, max_disk: float = 0, cache_dir: str = None):
+        if max_disk > 0 and cache_dir is None:
+            raise ValueError('cache_dir is required for a disk cache.')
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def memory_size(self) -> int:
+        """Number of bytes of results held in memory."""
+        return sum(value.nbytes for value in self._memory.values())
+
+    @property
+    def disk_size(self) -> int:
+        """Number of bytes of results saved on disk."""
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def key(self, function, data: np.ndarray, *args, **kwargs) -> str:
+        """
+        Computes the cache key of a call.
+
+        Arguments:
+            function: transform function.
+            data: input data, fingerprinted.
+            *args, **kwargs: other arguments of function, compared through
+                their repr, except n_jobs and verbose.
+
+        Returns:
+            key: hexadecimal digest.
+        """
+        kwargs = sorted((name, value) for name, value in kwargs.items() if name not in self.ignored)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((function.__module__, function.__name__, fingerprint(data), args, kwargs)).encode())
+        return h.hexdigest()
+
+    def get(self, function, data: np.ndarray, *args, **kwargs) -> np.ndarray:
+        """
+        Returns function(data, *args, **kwargs), from the cache if available.
+
+        Arguments:
+            function: transform function returning an array.
+            data: input data.
+            *args, **kwargs: other arguments of function.
+
+        Returns:
+            result: read-only array.
+        """
+        key = self.key(function, data, *args, **kwargs)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+            result = self._load(key)
+            if result is not None:
+                self.hits += 1
+                self._store(key, result)
+                return result
+            self.misses += 1
+
+        result = np.asarray(function(data, *args, **kwargs))
+        result.flags.writeable = False
+        with self._lock:
+            self._store(key, result)
+        return result
+
+    def clear(self):
+        """Removes all results from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._disk_entries():
+                os.remove(path)
+
+    def _store(self, key: str, result: np.ndarray):
+        if result.nbytes > self.max_memory:
+            self._save(key, result)
+            return
+        self._memory[key] = result
+        size = self.memory_size
+        while size > self.max_memory:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            size -= evicted.nbytes
+            self._save(evicted_key, evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def _disk_entries(self) -> list:
+        # (path, size, last access) of the saved results, least recent first
+        if self.cache_dir is None:
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def _save(self, key: str, result: np.ndarray):
+        if self.max_disk <= 0 or result.nbytes > self.max_disk or os.path.exists(self._path(key)):
+            return
+        tmp = self._path(key) + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, result)
+        os.replace(tmp, self._path(key))
+        entries = self._disk_entries()
+        size = sum(size for _, size, _ in entries)
+        for path, entry_size, _ in entries:
+            if size <= self.max_disk:
+                break
+            os.remove(path)
+            size -= entry_size
+
+    def _load(self, key: str):
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        result = np.load(self._path(key))
+        # mark as recently used
+        os.utime(self._path(key))
+        result.flags.writeable = False
+        return result
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Circular statistics
+
+| Option | Description |
+| ------ | ----------- |
+| title           | circular.py |
+| date            | 2026-10-17 |
+"""
+
+import numpy as np
+
+
+# helper function
+def _sin_cos_sums(angles: np.ndarray, axis: int = -1, keepdims: bool = False, chunk_size: int = 64) -> tuple:
+    """
+    Helper function summing the sines and cosines of angles along an axis,
+    chunk_size angles at a time, so that only chunk-sized sin and cos
+    temporaries are allocated instead of two arrays the size of angles.
+
+    Arguments:
+        angles: array of angles in radians.
+        axis: axis along which the sums are taken (default: -1).
+        keepdims: whether to keep the reduced axis with size one, boolean.
+        chunk_size: number of angles along axis processed at once.
+
+    Returns:
+        sin_sum, cos_sum: arrays of sums, in the dtype of angles.
+    """
+    angles = np.moveaxis(angles, axis, -1)
+    sin_sum = np.zeros(angles.shape[:-1], dtype=np.result_type(angles, np.float32))
+    cos_sum = np.zeros_like(sin_sum)
+    for start in range(0, angles.shape[-1], chunk_size):
+        chunk = angles[..., start:start + chunk_size]
+        sin_sum += np.sin(chunk).sum(axis=-1)
+        cos_sum += np.cos(chunk).sum(axis=-1)
+    if keepdims:
+        sin_sum = np.expand_dims(sin_sum, axis)
+        cos_sum = np.expand_dims(cos_sum, axis)
+    return sin_sum, cos_sum
+
+
+def circ_mean(angles: np.ndarray, axis: int = -1, keepdims: bool = False) -> np.ndarray:
+    """
+    Computes the circular mean of angles.
+
+    Arguments:
+        angles: array of angles in radians.
+        axis: axis along which the mean is taken (default: -1).
+        keepdims: whether to keep the reduced axis with size one, boolean.
+
+    Returns:
+        mean: array of mean angles in ]-pi, pi], in the dtype of angles.
+
+    Note:
+        The mean is the angle of the summed unit vectors, arctan2(sum sin,
+        sum cos). It matches astropy.stats.circmean without weights. The
+        sums are taken in chunks along axis, without full-size sin and cos
+        temporaries.
+    """
+    return np.arctan2(*_sin_cos_sums(angles, axis=axis, keepdims=keepdims))
+
+
+def resultant_length(angles: np.ndarray, axis: int = -1, keepdims: bool = False) -> np.ndarray:
+    """
+    Computes the mean resultant length of angles.
+
+    Arguments:
+        angles: array of angles in radians.
+        axis: axis along which the length is taken (default: -1).
+        keepdims: whether to keep the reduced axis with size one, boolean.
+
+    Returns:
+        length: array of lengths in [0, 1], 1 when all angles are equal.
+    """
+    n = angles.shape[axis]
+    return np.hypot(*_sin_cos_sums(angles, axis=axis, keepdims=keepdims)) / n
+
+
+def rayleigh_z(angles: np.ndarray, axis: int = -1, keepdims: bool = False) -> np.ndarray:
+    """
+    Computes the Rayleigh statistic for non-uniformity of angles.
+
+    Arguments:
+        angles: array of angles in radians.
+        axis: axis along which the statistic is taken (default: -1).
+        keepdims: whether to keep the reduced axis with size one, boolean.
+
+    Returns:
+        z: array of Rayleigh z = n * R**2, with n the number of angles and R
+            their mean resultant length.
+
+    Note:
+        Under the null hypothesis of uniformly distributed angles, the
+        p-value is approximately exp(-z) for large n (Fisher, 1993).
+    """
+    n = angles.shape[axis]
+    return n * resultant_length(angles, axis=axis, keepdims=keepdims) ** 2
+
+
+def centered_sin(angles: np.ndarray, axis: int = -1) -> np.ndarray:
+    """
+    Computes the sine of angles centered on their circular mean, in place.
+
+    Arguments:
+        angles: float array of angles in radians, overwritten.
+        axis: axis along which the circular mean is taken (default: -1).
+
+    Returns:
+        angles: the input array holding sin(angles - circ_mean(angles)).
+
+    Note:
+        These are the terms of the circular correlation coefficient
+        (Jammalamadaka & SenGupta, 2001). Working in place, with the
+        circular mean summed in chunks, avoids any full-size temporary of
+        the (epoch, freq, channel, time) array.
+    """
+    angles -= circ_mean(angles, axis=axis, keepdims=True)
+    return np.sin(angles, out=angles)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Cohort runner with per-dyad checkpoints
+
+| Option | Description |
+| ------ | ----------- |
+| title           | cohort.py |
+| date            | 2026-10-17 |
+"""
+
+import csv
+import json
+import os
+import pickle
+import time
+import traceback
+from collections import namedtuple, OrderedDict
+from typing import Union
+
+import numpy as np
+import mne
+
+from .analyses import pair_connectivity
+
+
+CohortResult = namedtuple('CohortResult', ['outputs', 'timings', 'errors'])
+
+
+def read_manifest(manifest: Union[str, list]) -> list:
+    """
+    Reads a cohort manifest.
+
+    Arguments:
+        manifest: path of a CSV file with a header row, or a list of
+            dictionaries. Each row describes one dyad and should have a
+            'dyad' identifier, used to name its checkpoint directory, and
+            the 'participant1' and 'participant2' Epochs files read by
+            load_dyad. Other columns are passed along to the stages.
+
+    Returns:
+        dyads: list of dictionaries, one per dyad.
+    """
+    if isinstance(manifest, (str, os.PathLike)):
+        with open(manifest, newline='') as f:
+            dyads = [dict(row) for row in csv.DictReader(f)]
+    else:
+        dyads = [dict(row) for row in manifest]
+
+    names = [str(dyad.get('dyad', '')) for dyad in dyads]
+    if '' in names:
+        raise ValueError("Each dyad of the manifest should have a 'dyad' identifier.")
+    if len(set(names)) != len(names):
+        raise ValueError('Dyad identifiers of the manifest should be unique.')
+    return dyads
+
+
+def load_dyad(data: None, dyad: dict) -> list:
+    """
+    Cohort stage reading the Epochs of both participants of a dyad.
+
+    Arguments:
+        data: unused, this is a first stage.
+        dyad: manifest row with 'participant1' and 'participant2' files.
+
+    Returns:
+        epochs: list of the 2 Epochs, with equalized numbers of epochs.
+    """
+    epochs = [mne.read_epochs(dyad[participant], preload=True, verbose=False)
+              for participant in ('participant1', 'participant2')]
+    mne.epochs.equalize_epoch_counts(epochs)
+    return epochs
+
+
+def connectivity_stage(epochs: list, dyad: dict, frequencies: Union[dict, list], mode: Union[str, list],
+                       **kwargs) -> Union[np.ndarray, dict]:
+    """
+    Cohort stage computing the connectivity of a dyad with pair_connectivity.
+    Use functools.partial to set the arguments, e.g.
+    partial(connectivity_stage, frequencies={'alpha': [8, 12]}, mode='plv').
+
+    Arguments:
+        epochs: list of the 2 Epochs of the dyad.
+        dyad: manifest row, unused.
+        frequencies, mode, **kwargs: see pair_connectivity.
+
+    Returns:
+        con: connectivity as returned by pair_connectivity.
+    """
+    data = np.array([epo.get_data() for epo in epochs])
+    return pair_connectivity(data, epochs[0].info['sfreq'], frequencies, mode, **kwargs)
+
+
+def checkpoint_path(output_dir: str, dyad: str, stage_index: int, stage: str) -> str:
+    """
+    Returns the checkpoint file of a stage of a dyad.
+
+    Arguments:
+        output_dir: output directory of the cohort.
+        dyad: dyad identifier.
+        stage_index: position of the stage in the chain.
+        stage: stage name.
+
+    Returns:
+        path: output_dir/dyad/<index>_<stage>.pkl
+    """
+    return os.path.join(output_dir, str(dyad), '{:02d}_{}.pkl'.format(stage_index, stage))
+
+
+def load_checkpoint(path: str):
+    """
+    Loads the output of a stage saved by run_cohort.
+
+    Arguments:
+        path: checkpoint file, e.g. from CohortResult.outputs.
+
+    Returns:
+        output: the object returned by the stage.
+    """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+# helper function
+def _save_checkpoint(output, path: str):
+    """
+    Helper function saving a stage output atomically, so that a run killed
+    while writing never leaves a checkpoint that looks complete.
+
+    Arguments:
+        output: object returned by the stage.
+        path: checkpoint file.
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+# helper function
+def _run_dyad(dyad: dict, stages: list, output_dir: str, overwrite: bool = False) -> tuple:
+    """
+    Helper function run by the workers of run_cohort: runs the stages of one
+    dyad, skipping those already checkpointed.
+
+    Arguments:
+        dyad: manifest row.
+        stages: list of (name, function) tuples.
+        output_dir: output directory of the cohort.
+        overwrite: whether to recompute existing checkpoints.
+
+    Returns:
+        name: dyad identifier.
+        output: checkpoint path of the last completed stage, or None.
+        timings: ordered dictionary of stage durations in seconds, None for
+            stages loaded from or left at a checkpoint.
+        error: formatted traceback if a stage failed, else None.
+    """
+    name = str(dyad['dyad'])
+    os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+    paths = [checkpoint_path(output_dir, name, i, stage) for i, (stage, _) in enumerate(stages)]
+    done = [os.path.exists(path) and not overwrite for path in paths]
+    # the stages after the last checkpoint are the ones to run
+    first = max([i + 1 for i, exists in enumerate(done) if exists], default=0)
+
+    timings = OrderedDict((stage, None) for stage, _ in stages)
+    data = load_checkpoint(paths[first - 1]) if 0 < first < len(stages) else None
+    output = paths[first - 1] if first else None
+    error = None
+    for i in range(first, len(stages)):
+        stage, function = stages[i]
+        start = time.perf_counter()
+        try:
+            data = function(data, dyad)
+        except Exception:
+            error = '{} failed at stage {}:\n{}'.format(name, stage, traceback.format_exc())
+            break
+        _save_checkpoint(data, paths[i])
+        timings[stage] = time.perf_counter() - start
+        output = paths[i]
+
+    with open(os.path.join(output_dir, name, 'timings.json'), 'w') as f:
+        json.dump(timings, f, indent=2)
+    return name, output, timings, error
+
+
+def run_cohort(manifest: Union[str, list], stages: list, output_dir: str, n_jobs: int = 1,
+               overwrite: bool = False, verbose: bool = True) -> CohortResult:
+    """
+    Runs a chain of stages on every dyad of a cohort, in a process pool,
+    with a checkpoint after each stage of each dyad.
+
+    Arguments:
+        manifest: CSV file or list of dictionaries describing the dyads,
+            see read_manifest.
+        stages: ordered list of (name, function) tuples. Each function is
+            called as function(data, dyad), with data the output of the
+            previous stage (None for the first one) and dyad the manifest
+            row, and its output is checkpointed. Functions should be
+            picklable, e.g. module-level functions or functools.partial.
+            Example: [('load', load_dyad), ('prep', my_cleaning),
+            ('connectivity', partial(connectivity_stage,
+            frequencies={'alpha': [8, 12]}, mode='ccorr'))]
+        output_dir: directory holding one sub-directory of checkpoints per
+            dyad, output_dir/<dyad>/<index>_<stage>.pkl, and its
+            timings.json.
+        n_jobs: number of worker processes, -1 uses all cores (default: 1).
+        overwrite: whether to recompute stages that are already
+            checkpointed, boolean (default: False, resume).
+        verbose: whether to print the duration of each stage, boolean.
+
+    Returns:
+        result: namedtuple with
+          - outputs: dictionary mapping each dyad to the checkpoint of its
+            last completed stage (None if none), to be read with
+            load_checkpoint.
+          - timings: dictionary mapping each dyad to the duration in seconds
+            of each stage run, None for stages skipped or not reached.
+          - errors: dictionary mapping each failed dyad to its traceback.
+
+    Note:
+        A dyad whose stage raises an exception is reported in errors and
+        the other dyads continue. A new call with the same output_dir
+        resumes every dyad after its last checkpoint, so completed work is
+        never recomputed. Group-level statistics (e.g. stats.statscondCluster)
+        can then be run on the loaded outputs.
+    """
+    dyads = read_manifest(manifest)
+    names = [stage for stage, _ in stages]
+    if len(set(names)) != len(names):
+        raise ValueError('Stage names should be unique.')
+    os.makedirs(output_dir, exist_ok=True)
+
+    parallel, p_fun, n_jobs = mne.parallel.parallel_func(_run_dyad, n_jobs, prefer='processes',
+                                                         max_jobs=len(dyads), verbose=False)
+    results = parallel(p_fun(dyad, stages, output_dir, overwrite) for dyad in dyads)
+
+    outputs, timings, errors = {}, {}, {}
+    for name, output, timing, error in results:
+        outputs[name] = output
+        timings[name] = timing
+        if error is not None:
+            errors[name] = error
+        if verbose:
+            for stage, duration in timing.items():
+                status = 'skipped' if duration is None else '{:.2f} s'.format(duration)
+                print('{} {}: {}'.format(name, stage, status))
+            if error is not None:
+                print(error)
+
+    return CohortResult(outputs=outputs, timings=timings, errors=errors)
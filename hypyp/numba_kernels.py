@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Numba-compiled kernels for compute_sync(backend='numba')
+
+| Option | Description |
+| ------ | ----------- |
+| title           | numba_kernels.py |
+| date            | 2026-10-17 |
+
+This module requires numba and is only imported when the numba backend is
+requested. The kernels loop over channel pairs in parallel and over time
+samples sequentially, accumulating in scalars instead of allocating
+(channel, channel, time) intermediates.
+"""
+
+import numpy as np
+import numba
+
+
+@numba.njit(parallel=True, cache=True)
+def _phase_lag_sums_kernel(x, y, paired, sign, imag, abs_, sq):
+    n_epoch, n_freq, n_x, n_samp = x.shape
+    n_y = 1 if paired else y.shape[2]
+    for k in numba.prange(n_epoch * n_freq * n_x):
+        e = k // (n_freq * n_x)
+        f = (k // n_x) % n_freq
+        i = k % n_x
+        for jj in range(n_y):
+            j = i if paired else jj
+            s_sign = 0.
+            s_imag = 0.
+            s_abs = 0.
+            s_sq = 0.
+            for t in range(n_samp):
+                # imaginary part of x * conj(y)
+                im = x[e, f, i, t].imag * y[e, f, j, t].real - x[e, f, i, t].real * y[e, f, j, t].imag
+                s_imag += im
+                s_abs += abs(im)
+                s_sq += im * im
+                if im > 0:
+                    s_sign += 1.
+                elif im < 0:
+                    s_sign -= 1.
+            sign[e, f, i, jj] = s_sign
+            imag[e, f, i, jj] = s_imag
+            abs_[e, f, i, jj] = s_abs
+            sq[e, f, i, jj] = s_sq
+
+
+def phase_lag_sums(x: np.ndarray, y: np.ndarray, paired: bool = False) -> dict:
+    """
+    Computes the sums over time needed by the phase lag measures (pli, wpli,
+    wpli2_debiased), see analyses._phase_lag_sums.
+
+    Arguments:
+        x: analytic signals of the rows, shape (n_epochs, n_freq, n_ch_x, n_times).
+        y: analytic signals of the columns, shape (n_epochs, n_freq, n_ch_y, n_times).
+        paired: if True, only the matching rows of x and y are combined.
+
+    Returns:
+        sums: dictionary of arrays of shape (n_epochs, n_freq, n_ch_x, n_ch_y),
+            or (n_epochs, n_freq, n_pairs) if paired, with keys 'sign',
+            'imag', 'abs' and 'sq'. Sums are accumulated in double precision.
+    """
+    shape = x.shape[:-1] + (1 if paired else y.shape[-2],)
+    sums = {key: np.empty(shape, dtype=x.real.dtype) for key in ('sign', 'imag', 'abs', 'sq')}
+    _phase_lag_sums_kernel(x, y, paired, sums['sign'], sums['imag'], sums['abs'], sums['sq'])
+    if paired:
+        sums = {key: value[..., 0] for key, value in sums.items()}
+    return sums
+
+
+@numba.njit(parallel=True, cache=True)
+def _centered_sin_kernel(x, out):
+    n_epoch, n_freq, n_ch, n_samp = x.shape
+    for k in numba.prange(n_epoch * n_freq * n_ch):
+        e = k // (n_freq * n_ch)
+        f = (k // n_ch) % n_freq
+        c = k % n_ch
+        # circular mean of the phases from the summed unit phasors
+        s = 0.
+        co = 0.
+        for t in range(n_samp):
+            r = abs(x[e, f, c, t])
+            if r > 0:
+                s += x[e, f, c, t].imag / r
+                co += x[e, f, c, t].real / r
+            else:
+                # np.angle(0) is 0
+                co += 1.
+        mu = np.arctan2(s, co)
+        sin_mu = np.sin(mu)
+        cos_mu = np.cos(mu)
+        # sin(phase - mu) = sin(phase) cos(mu) - cos(phase) sin(mu)
+        for t in range(n_samp):
+            r = abs(x[e, f, c, t])
+            if r > 0:
+                out[e, f, c, t] = (x[e, f, c, t].imag * cos_mu - x[e, f, c, t].real * sin_mu) / r
+            else:
+                out[e, f, c, t] = -sin_mu
+
+
+def centered_sin(x: np.ndarray) -> np.ndarray:
+    """
+    Computes the sine of the phases of analytic signals centered on their
+    circular mean over time, see circular.centered_sin.
+
+    Arguments:
+        x: analytic signals, shape (n_epochs, n_freq, n_ch, n_times).
+
+    Returns:
+        out: real array of the same shape, without computing the phases
+            themselves.
+    """
+    out = np.empty(x.shape, dtype=x.real.dtype)
+    _centered_sin_kernel(x, out)
+    return out
@@ -14,9 +14,7 @@ Data preprocessing functions
 
 import numpy as np
 import copy
-import matplotlib.pyplot as plt
 import mne
-from autoreject import get_rejection_threshold, AutoReject
 from mne.preprocessing import ICA, corrmap
 
 
@@ -166,6 +164,8 @@ def ICA_fit(epochs: list, n_components: int, method: str, fit_params: dict, rand
         icas: list of Independant Components for each participant (IC are MNE
             objects, see MNE documentation for more details).
     """
+    from autoreject import get_rejection_threshold
+
     icas = []
     for epoch in epochs:
         # per subj
@@ -222,6 +222,8 @@ def AR_local(cleaned_epochs_ICA: list, strategy:str = 'union', threshold:float =
     dic_AR['threshold'] = threshold
 
     # defaults values for n_interpolates and consensus_percs
+    from autoreject import AutoReject
+
     n_interpolates = np.array([1, 4, 32])
     consensus_percs = np.linspace(0, 1.0, 11)
     # more generous values
@@ -298,6 +300,7 @@ def AR_local(cleaned_epochs_ICA: list, strategy:str = 'union', threshold:float =
         evoked_after_AR.append(clean.average())
 
     if verbose:
+        import matplotlib.pyplot as plt
         for i, j in zip(evoked_before, evoked_after_AR):
             fig, axes = plt.subplots(2, 1, figsize=(6, 6))
             for ax in axes:
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Real-time inter-brain synchrony
+
+| Option | Description |
+| ------ | ----------- |
+| title           | realtime.py |
+| date            | 2026-10-17 |
+"""
+
+import time
+from collections import namedtuple
+from typing import Union
+
+import numpy as np
+import scipy.signal as signal
+import mne
+
+from .analyses import compute_sync
+
+
+SyncFrame = namedtuple('SyncFrame', ['time', 'con', 'compute_time'])
+
+
+class RingBuffer:
+    """
+    Fixed-capacity circular buffer of multichannel samples.
+
+    Arguments:
+        n_channels: number of rows of each sample (e.g. channels), int or tuple.
+        capacity: maximal number of samples kept.
+        dtype: dtype of the stored samples.
+    """
+
+    def __init__(self, n_channels: Union[int, tuple], capacity: int, dtype: np.dtype = np.complex128):
+        shape = (n_channels,) if isinstance(n_channels, int) else tuple(n_channels)
+        self.capacity = capacity
+        self._data = np.zeros(shape + (capacity,), dtype=dtype)
+        self.n_written = 0
+
+    def __len__(self) -> int:
+        return min(self.n_written, self.capacity)
+
+    def write(self, chunk: np.ndarray):
+        """
+        Appends samples, the oldest ones being overwritten.
+
+        Arguments:
+            chunk: samples, shape (..., n_samples).
+        """
+        n = chunk.shape[-1]
+        if n >= self.capacity:
+            # keep the newest sample at (n_written + n) % capacity - 1, as read() expects
+            idx = (self.n_written + n - self.capacity + np.arange(self.capacity)) % self.capacity
+            self._data[..., idx] = chunk[..., -self.capacity:]
+        else:
+            start = self.n_written % self.capacity
+            stop = start + n
+            if stop <= self.capacity:
+                self._data[..., start:stop] = chunk
+            else:
+                split = self.capacity - start
+                self._data[..., start:] = chunk[..., :split]
+                self._data[..., :stop - self.capacity] = chunk[..., split:]
+        self.n_written += n
+
+    def read(self, n_samples: int) -> np.ndarray:
+        """
+        Returns the n_samples most recent samples, in chronological order.
+
+        Arguments:
+            n_samples: number of samples, at most the number of stored samples.
+
+        Returns:
+            data: array of shape (..., n_samples).
+        """
+        if n_samples > len(self):
+            raise ValueError('Not enough samples in the buffer.')
+        stop = self.n_written % self.capacity
+        idx = np.arange(stop - n_samples, stop) % self.capacity
+        return self._data[..., idx]
+
+
+class FileReplaySource:
+    """
+    Replays a .fif recording chunk by chunk, standing in for an acquisition
+    device so that the real-time pipeline can be run offline.
+
+    Epochs files are replayed as the concatenation of their epochs.
+
+    Arguments:
+        fname: path to a raw or epochs .fif file, or an already loaded
+            mne.io.Raw or mne.Epochs object.
+        chunk_size: number of samples returned by each read().
+        realtime: if True, read() sleeps so that chunks are delivered at the
+            sampling rate of the recording.
+        picks: channels to replay, see mne.io.Raw.get_data. Defaults to the
+            EEG channels.
+    """
+
+    def __init__(self, fname: Union[str, mne.io.BaseRaw, mne.BaseEpochs], chunk_size: int = 32,
+                 realtime: bool = False, picks: Union[str, list] = 'eeg'):
+        if isinstance(fname, (mne.io.BaseRaw, mne.BaseEpochs)):
+            inst = fname
+        elif str(fname).endswith(('-epo.fif', '_epo.fif', '-epo.fif.gz', '_epo.fif.gz')):
+            inst = mne.read_epochs(fname, preload=True, verbose=False)
+        else:
+            inst = mne.io.read_raw_fif(fname, preload=True, verbose=False)
+
+        data = inst.get_data(picks=picks)
+        if data.ndim == 3:
+            data = np.concatenate(list(data), axis=-1)
+        self._data = data
+        self.sfreq = inst.info['sfreq']
+        self.n_channels = data.shape[0]
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self._position = 0
+        self._start = None
+
+    def read(self) -> Union[np.ndarray, None]:
+        """
+        Returns the next chunk of samples.
+
+        Returns:
+            chunk: array of shape (n_channels, chunk_size), shorter for the
+                last chunk, or None once the recording is exhausted.
+        """
+        if self._position >= self._data.shape[-1]:
+            return None
+        if self.realtime:
+            if self._start is None:
+                self._start = time.perf_counter()
+            due = self._start + (self._position + self.chunk_size) / self.sfreq
+            time.sleep(max(0, due - time.perf_counter()))
+        chunk = self._data[:, self._position:self._position + self.chunk_size]
+        self._position += self.chunk_size
+        return chunk
+
+
+def hilbert_fir(n_taps: int) -> np.ndarray:
+    """
+    Designs a causal FIR Hilbert transformer (Hamming-windowed ideal
+    response).
+
+    Arguments:
+        n_taps: odd number of taps. The group delay is (n_taps - 1) / 2 samples.
+
+    Returns:
+        taps: FIR coefficients.
+    """
+    if n_taps % 2 == 0:
+        raise ValueError('n_taps should be odd.')
+    n = np.arange(n_taps) - (n_taps - 1) // 2
+    taps = np.zeros(n_taps)
+    odd = n % 2 != 0
+    taps[odd] = 2 / (np.pi * n[odd])
+    return taps * np.hamming(n_taps)
+
+
+class _CausalAnalyticFilter:
+    """
+    Stateful causal band-pass filter followed by an FIR Hilbert transformer,
+    producing a delayed estimate of the analytic signal per band.
+    """
+
+    def __init__(self, sfreq: float, n_channels: int, freq_bands: dict, filter_order: int, n_taps: int):
+        self.sos = [signal.butter(filter_order, band, btype='bandpass', fs=sfreq, output='sos')
+                    for band in freq_bands.values()]
+        self.sos_state = [np.zeros((sos.shape[0], n_channels, 2)) for sos in self.sos]
+        self.hilbert = hilbert_fir(n_taps)
+        self.delay = np.zeros(n_taps)
+        self.delay[(n_taps - 1) // 2] = 1
+        self.hilbert_state = [np.zeros((n_channels, n_taps - 1)) for _ in self.sos]
+        self.delay_state = [np.zeros((n_channels, n_taps - 1)) for _ in self.sos]
+
+    def __call__(self, chunk: np.ndarray) -> np.ndarray:
+        out = np.empty((chunk.shape[0], len(self.sos), chunk.shape[1]), dtype=np.complex128)
+        for band, sos in enumerate(self.sos):
+            filtered, self.sos_state[band] = signal.sosfilt(sos, chunk, axis=-1, zi=self.sos_state[band])
+            imag, self.hilbert_state[band] = signal.lfilter(self.hilbert, 1, filtered, axis=-1,
+                                                            zi=self.hilbert_state[band])
+            real, self.delay_state[band] = signal.lfilter(self.delay, 1, filtered, axis=-1,
+                                                          zi=self.delay_state[band])
+            out[:, band] = real + 1j * imag
+        return out
+
+
+class RealTimeSync:
+    """
+    Real-time inter-brain synchrony engine for two synchronized streams.
+
+    Incoming chunks are band-passed causally (Butterworth, second-order
+    sections with persistent state) and turned into analytic signals with a
+    causal FIR Hilbert transformer. The analytic signals are kept in ring
+    buffers and, every hop, compute_sync is run on the last window.
+
+    Arguments:
+        sfreq: sampling rate of both streams.
+        n_channels: number of channels of each participant.
+        freq_bands: dictionary of frequency bands, e.g. {'alpha': [8, 12]}.
+        mode: connectivity measure or list of measures supported by
+            compute_sync (e.g. 'plv', 'coh', 'envelope_corr').
+        window: length of the sliding window in seconds.
+        hop: time between two published frames in seconds.
+        blocks: connectivity blocks, 'inter' (default), 'intra' or 'all'.
+        filter_order: order of the Butterworth band-pass filters.
+        n_taps: odd number of taps of the Hilbert transformer. Defaults to
+            one period of the lowest band edge, which sets the group delay
+            to half a period.
+        drop_late: if True (default), when a chunk makes several frames due,
+            only the most recent one is computed so that the latency stays
+            bounded; the skipped frames are counted in latency()['n_dropped'].
+        callback: optional function called with each published SyncFrame.
+
+    Note:
+        The analytic signal is delayed by (n_taps - 1) / 2 samples with
+        respect to the input; this group delay is part of the reported
+        latency.
+    """
+
+    def __init__(self, sfreq: float, n_channels: int, freq_bands: dict, mode: Union[str, list] = 'plv',
+                 window: float = 1., hop: float = 0.25, blocks: str = 'inter', filter_order: int = 4,
+                 n_taps: int = None, drop_late: bool = True, callback=None):
+        self.sfreq = sfreq
+        self.n_channels = n_channels
+        self.freq_bands = freq_bands
+        self.mode = mode
+        self.blocks = blocks
+        self.window = int(round(window * sfreq))
+        self.hop = int(round(hop * sfreq))
+        if self.window < 1 or self.hop < 1:
+            raise ValueError('window and hop should be at least one sample long.')
+        if n_taps is None:
+            n_taps = 2 * int(np.ceil(sfreq / min(band[0] for band in freq_bands.values()) / 2)) + 1
+        self.n_taps = n_taps
+        self.drop_late = drop_late
+        self.callback = callback
+
+        self._filters = [_CausalAnalyticFilter(sfreq, n_channels, freq_bands, filter_order, n_taps)
+                         for _ in range(2)]
+        self._buffers = [RingBuffer((n_channels, len(freq_bands)), self.window) for _ in range(2)]
+        # the first window starts once the Hilbert transformer delay line is filled
+        self._next_frame = self.window + (n_taps - 1) // 2
+        self._compute_times = []
+        self.n_dropped = 0
+
+    @property
+    def group_delay(self) -> float:
+        """Delay of the analytic signal estimate, in seconds."""
+        return (self.n_taps - 1) / 2 / self.sfreq
+
+    def push(self, chunk1: np.ndarray, chunk2: np.ndarray) -> list:
+        """
+        Feeds one chunk of samples of each participant.
+
+        Arguments:
+            chunk1: samples of participant 1, shape (n_channels, n_samples).
+            chunk2: samples of participant 2, same shape as chunk1.
+
+        Returns:
+            frames: list of the SyncFrame published during this call. Each
+                frame has the stream time (in s) of the end of its window,
+                the connectivity (n_bands, n_ch, n_ch) as returned by
+                compute_sync (a dictionary for a list of modes), and the
+                time spent computing it.
+        """
+        assert chunk1.shape == chunk2.shape, "Both streams should deliver chunks of the same shape."
+        n_samples = chunk1.shape[-1]
+        frames = []
+        start = self._buffers[0].n_written
+        due = []
+        frame = self._next_frame
+        while frame <= start + n_samples:
+            due.append(frame)
+            frame += self.hop
+        self._next_frame = frame
+        if self.drop_late and len(due) > 1:
+            self.n_dropped += len(due) - 1
+            due = due[-1:]
+
+        analytic = [analytic_filter(chunk) for analytic_filter, chunk in zip(self._filters, (chunk1, chunk2))]
+        written = start
+        for frame in due:
+            # write up to the end of the frame's window, then compute
+            for buffer, values in zip(self._buffers, analytic):
+                buffer.write(values[..., written - start:frame - start])
+            written = frame
+            frames.append(self._compute(frame))
+        for buffer, values in zip(self._buffers, analytic):
+            buffer.write(values[..., written - start:])
+        return frames
+
+    def _compute(self, frame: int) -> SyncFrame:
+        tic = time.perf_counter()
+        complex_signal = np.array([buffer.read(self.window) for buffer in self._buffers])[:, np.newaxis]
+        con = compute_sync(complex_signal, self.mode, epochs_average=True, blocks=self.blocks)
+        compute_time = time.perf_counter() - tic
+        self._compute_times.append(compute_time)
+        result = SyncFrame(time=frame / self.sfreq, con=con, compute_time=compute_time)
+        if self.callback is not None:
+            self.callback(result)
+        return result
+
+    def run(self, source1, source2):
+        """
+        Consumes two sources (e.g. FileReplaySource) until one is exhausted,
+        yielding the frames as they are published.
+
+        Arguments:
+            source1: source of participant 1, with a read() method returning
+                (n_channels, n_samples) chunks, or None at the end.
+            source2: source of participant 2, delivering chunks of the same size.
+
+        Yields:
+            frame: SyncFrame.
+        """
+        while True:
+            chunk1, chunk2 = source1.read(), source2.read()
+            if chunk1 is None or chunk2 is None:
+                return
+            n_samples = min(chunk1.shape[-1], chunk2.shape[-1])
+            yield from self.push(chunk1[:, :n_samples], chunk2[:, :n_samples])
+
+    def latency(self) -> dict:
+        """
+        Latency metrics of the published frames.
+
+        Returns:
+            metrics: dictionary with the number of frames ('n_frames') and of
+                dropped frames ('n_dropped'), the group delay of the analytic
+                signal ('group_delay'), the mean, max and last compute times
+                ('compute_mean', 'compute_max', 'compute_last') and the
+                worst-case latency from the last sample of a window to its
+                publication ('latency_max' = group_delay + compute_max), all
+                in seconds.
+        """
+        compute_times = np.array(self._compute_times) if self._compute_times else np.zeros(1)
+        return dict(n_frames=len(self._compute_times), n_dropped=self.n_dropped,
+                    group_delay=self.group_delay,
+                    compute_mean=float(np.mean(compute_times)), compute_max=float(np.max(compute_times)),
+                    compute_last=float(compute_times[-1]),
+                    latency_max=self.group_delay + float(np.max(compute_times)))
@@ -15,7 +15,6 @@ Statistical functions
 from collections import namedtuple
 import numpy as np
 import scipy
-import matplotlib.pylab as plt
 import mne
 from mne.channels import find_ch_adjacency
 from mne.stats import permutation_cluster_test
@@ -142,6 +141,7 @@ def con_matrix(epochs: mne.Epochs, freqs_mean: list, draw: bool = False) -> tupl
     ch_con_freq = np.multiply(init, ch_con_mult)
 
     if draw:
+        import matplotlib.pyplot as plt
         plt.figure()
         # visualizing the matrix and transforming it into array
         plt.subplot(1, 2, 1)
@@ -218,6 +218,7 @@ def metaconn_matrix_2brains(electrodes: list, ch_con: scipy.sparse.csr_matrix, f
     metaconn_freq = np.multiply(init, metaconn_mult)
 
     if plot:
+        import matplotlib.pyplot as plt
         # vizualising the array
         plt.figure()
         plt.spy(metaconn_freq)
@@ -286,6 +287,7 @@ def metaconn_matrix(electrodes: list, ch_con: scipy.sparse.csr_matrix, freqs_mea
 
     # TODO: option with verbose
     # vizualising the array
+    import matplotlib.pyplot as plt
     plt.spy(metaconn_freq)
 
     metaconn_matrixTuple = namedtuple(
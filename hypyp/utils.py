@@ -13,7 +13,6 @@ Useful tools
 
 
 import numpy as np
-import pandas as pd
 from scipy.integrate import solve_ivp
 import mne
 from mne.io.constants import FIFF
@@ -142,6 +141,8 @@ def merge(epoch_S1: mne.Epochs, epoch_S2: mne.Epochs) -> mne.Epochs:
     for i in ch_names:
         ch_names2.append(i+'_S2')
 
+    import pandas as pd
+
     merges = []
 
     # checking wether data have the same size
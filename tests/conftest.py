@@ -1,5 +1,6 @@
 import pytest
 import os
+import numpy as np
 from collections import namedtuple
 import mne
 from hypyp import utils
@@ -20,3 +21,13 @@ def epochs():
     epochsTuple = namedtuple('epochs', ['epo1', 'epo2', 'epoch_merge'])
 
     return epochsTuple(epo1=epo1, epo2=epo2, epoch_merge=epoch_merge)
+
+
+@pytest.fixture
+def complex_signal():
+    """
+    Random analytic signals of a dyad, shape (2, n_epochs, n_channels, n_freq, n_times)
+    """
+    rng = np.random.default_rng(42)
+    shape = (2, 3, 4, 2, 100)
+    return rng.standard_normal(shape) + 1j * rng.standard_normal(shape)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import numpy as np
+import pytest
+from hypyp import analyses
+from hypyp.cache import TransformCache, fingerprint
+
+
+def _double(data, factor=2, n_jobs=1):
+    _double.calls += 1
+    return data * factor
+
+
+def test_transform_cache(tmp_path):
+    """
+    Test memoization, LRU eviction and the disk level of the transform cache
+    """
+    rng = np.random.default_rng(0)
+    arrays = [rng.standard_normal(100) for _ in range(3)]
+    assert fingerprint(arrays[0]) == fingerprint(arrays[0].copy())
+    assert fingerprint(arrays[0]) != fingerprint(arrays[0].astype(np.float32))
+
+    _double.calls = 0
+    # room for two results of 800 bytes in memory
+    cache = TransformCache(max_memory=1600)
+    result = cache.get(_double, arrays[0])
+    np.testing.assert_array_equal(result, 2 * arrays[0])
+    assert not result.flags.writeable
+    cache.get(_double, arrays[0], n_jobs=4)
+    assert (cache.hits, cache.misses, _double.calls) == (1, 1, 1)
+    cache.get(_double, arrays[0], factor=3)
+    cache.get(_double, arrays[1])
+    assert cache.memory_size == 1600
+    # arrays[0] with factor 2 was the least recently used result
+    cache.get(_double, arrays[0])
+    assert _double.calls == 4
+
+    cache = TransformCache(max_memory=800, max_disk=1600, cache_dir=str(tmp_path))
+    for data in arrays:
+        cache.get(_double, data)
+    assert cache.disk_size <= 1600
+    cache = TransformCache(max_memory=800, max_disk=1600, cache_dir=str(tmp_path))
+    cache.get(_double, arrays[1])
+    assert cache.hits == 1 and _double.calls == 7
+
+    with pytest.raises(ValueError):
+        TransformCache(max_disk=1e6)
+
+
+@pytest.mark.filterwarnings('ignore:filter_length')
+def test_pair_connectivity_cache():
+    """
+    Test that pair_connectivity reuses cached analytic signals
+    """
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal((2, 3, 4, 500))
+    freq_bands = {'alpha': [8, 12], 'beta': [12, 20]}
+    cache = TransformCache()
+    for mode in ['plv', 'ccorr']:
+        np.testing.assert_allclose(analyses.pair_connectivity(data, 250, freq_bands, mode, cache=cache),
+                                   analyses.pair_connectivity(data, 250, freq_bands, mode))
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import numpy as np
+from hypyp import circular
+
+
+def test_circ_mean():
+    """
+    Test circular mean, resultant length and Rayleigh z on known angles
+    """
+    rng = np.random.default_rng(0)
+    # angles wrapping around pi, where the arithmetic mean fails
+    angles = np.pi + rng.uniform(-0.1, 0.1, (3, 200))
+    mean = circular.circ_mean(angles)
+    assert mean.shape == (3,)
+    np.testing.assert_allclose(np.cos(mean), -1, atol=1e-2)
+    assert circular.circ_mean(angles.astype(np.float32), keepdims=True).dtype == np.float32
+
+    np.testing.assert_allclose(circular.resultant_length(np.zeros((2, 10)), axis=1), 1)
+    uniform = np.linspace(-np.pi, np.pi, 100, endpoint=False)
+    np.testing.assert_allclose(circular.resultant_length(uniform), 0, atol=1e-12)
+    np.testing.assert_allclose(circular.rayleigh_z(angles), 200 * circular.resultant_length(angles) ** 2)
+
+    centered = circular.centered_sin(angles.copy())
+    np.testing.assert_allclose(centered, np.sin(angles - mean[:, np.newaxis]))
+    np.testing.assert_allclose(circular.circ_mean(np.arcsin(centered)), 0, atol=1e-12)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+from functools import partial
+import numpy as np
+import pytest
+from hypyp import analyses
+from hypyp import cohort
+
+
+def _crop(epochs, dyad):
+    if not os.path.exists(dyad['flag']):
+        # simulate a node dying on the first run
+        raise RuntimeError('interrupted')
+    return [epo.crop(tmax=epo.times[255]) for epo in epochs]
+
+
+@pytest.mark.filterwarnings('ignore:filter_length')
+def test_run_cohort(tmp_path):
+    """
+    Test the cohort runner, its checkpoints and resuming after a failure
+    """
+    fname = os.path.join('data', 'participant2-epo.fif')
+    flag = str(tmp_path / 'flag')
+    manifest = [{'dyad': 'dyad{}'.format(i), 'participant1': fname, 'participant2': fname, 'flag': flag}
+                for i in range(2)]
+    freq_bands = {'alpha': [8, 12]}
+    stages = [('load', cohort.load_dyad),
+              ('crop', _crop),
+              ('connectivity', partial(cohort.connectivity_stage, frequencies=freq_bands, mode='plv',
+                                       blocks='inter'))]
+    output_dir = str(tmp_path / 'out')
+
+    result = cohort.run_cohort(manifest, stages, output_dir, verbose=False)
+    assert sorted(result.errors) == ['dyad0', 'dyad1']
+    assert result.outputs['dyad0'] == cohort.checkpoint_path(output_dir, 'dyad0', 0, 'load')
+    assert result.timings['dyad0']['crop'] is None
+
+    open(flag, 'w').close()
+    result = cohort.run_cohort(manifest, stages, output_dir, n_jobs=2, verbose=False)
+    assert result.errors == {}
+    timings = result.timings['dyad1']
+    assert timings['load'] is None and timings['crop'] > 0 and timings['connectivity'] > 0
+
+    epochs = cohort.load_checkpoint(cohort.checkpoint_path(output_dir, 'dyad1', 1, 'crop'))
+    data = np.array([epo.get_data() for epo in epochs])
+    expected = analyses.pair_connectivity(data, epochs[0].info['sfreq'], freq_bands, 'plv', blocks='inter')
+    np.testing.assert_allclose(cohort.load_checkpoint(result.outputs['dyad1']), expected)
+
+    # everything is checkpointed, nothing is recomputed
+    result = cohort.run_cohort(manifest, stages, output_dir, verbose=False)
+    assert all(duration is None for duration in result.timings['dyad0'].values())
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import subprocess
+import sys
+
+# seconds `import hypyp.analyses` may add on top of numpy, scipy.signal and mne
+IMPORT_BUDGET = float(os.environ.get('HYPYP_IMPORT_BUDGET', 1.0))
+
+LAZY_MODULES = ['matplotlib', 'astropy', 'statsmodels', 'autoreject', 'pandas', 'meshio']
+
+
+def _run(code):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get('PYTHONPATH', '')]))
+    return subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                          capture_output=True, text=True).stdout.split()
+
+
+def test_lazy_imports():
+    """
+    Test that importing hypyp and hypyp.analyses leaves heavy dependencies unloaded
+    """
+    code = ("import sys, hypyp, hypyp.analyses; "
+            "print(*[m for m in {} if m in sys.modules])".format(LAZY_MODULES))
+    assert _run(code) == []
+    assert _run("import hypyp; print(hypyp.stats.__name__)") == ['hypyp.stats']
+
+
+def test_import_time():
+    """
+    Test that the import time of hypyp.analyses stays within its budget
+    """
+    code = ("import time, numpy, scipy.signal, mne; t = time.perf_counter(); "
+            "import hypyp.analyses; print(time.perf_counter() - t)")
+    assert float(_run(code)[0]) < IMPORT_BUDGET
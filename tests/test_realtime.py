@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import numpy as np
+from hypyp import analyses
+from hypyp import realtime
+
+
+def test_ring_buffer():
+    """
+    Test that the ring buffer returns the most recent samples in order
+    """
+    buffer = realtime.RingBuffer(2, 10, dtype=float)
+    buffer.write(np.tile(np.arange(7), (2, 1)))
+    buffer.write(np.tile(np.arange(7, 13), (2, 1)))
+    assert len(buffer) == 10
+    np.testing.assert_array_equal(buffer.read(5)[1], np.arange(8, 13))
+
+    # chunks longer than the buffer keep the write position
+    buffer = realtime.RingBuffer(1, 10, dtype=float)
+    buffer.write(np.arange(3)[np.newaxis])
+    buffer.write(np.arange(3, 15)[np.newaxis])
+    np.testing.assert_array_equal(buffer.read(10)[0], np.arange(5, 15))
+    buffer.write(np.arange(15, 19)[np.newaxis])
+    np.testing.assert_array_equal(buffer.read(10)[0], np.arange(9, 19))
+
+
+def test_realtime_sync():
+    """
+    Test that frames computed from replayed chunks match an offline computation
+    """
+    fname = os.path.join("data", "participant2-epo.fif")
+    sources = [realtime.FileReplaySource(fname, chunk_size=37) for _ in range(2)]
+    freq_bands = {'alpha': [8, 12]}
+    engine = realtime.RealTimeSync(sources[0].sfreq, sources[0].n_channels, freq_bands,
+                                   mode=['plv', 'coh'], window=0.5, hop=0.2)
+    frames = list(engine.run(*sources))
+    assert len(frames) == engine.latency()['n_frames']
+    assert frames[0].con['plv'].shape == (1, 31, 31)
+
+    # same causal transform on the whole recording at once
+    data = realtime.FileReplaySource(fname)._data
+    analytic = realtime._CausalAnalyticFilter(sources[0].sfreq, data.shape[0], freq_bands, 4, engine.n_taps)(data)
+    frame = frames[3]
+    stop = int(round(frame.time * sources[0].sfreq))
+    window = analytic[..., stop - engine.window:stop]
+    complex_signal = np.array([window, window])[:, np.newaxis]
+    np.testing.assert_allclose(frame.con['coh'], analyses.compute_sync(complex_signal, 'coh', blocks='inter'))
+
+
+def test_realtime_sync_long_chunks():
+    """
+    Test frames when chunks are longer than the window
+    """
+    fname = os.path.join("data", "participant2-epo.fif")
+    sources = [realtime.FileReplaySource(fname, chunk_size=260) for _ in range(2)]
+    freq_bands = {'alpha': [8, 12]}
+    engine = realtime.RealTimeSync(sources[0].sfreq, sources[0].n_channels, freq_bands,
+                                   mode='coh', window=0.5, hop=0.6, drop_late=False)
+    frames = list(engine.run(*sources))
+    assert engine.latency()['n_dropped'] == 0
+
+    data = realtime.FileReplaySource(fname)._data
+    analytic = realtime._CausalAnalyticFilter(sources[0].sfreq, data.shape[0], freq_bands, 4, engine.n_taps)(data)
+    for frame in frames[:3]:
+        stop = int(round(frame.time * sources[0].sfreq))
+        window = analytic[..., stop - engine.window:stop]
+        complex_signal = np.array([window, window])[:, np.newaxis]
+        np.testing.assert_allclose(frame.con, analyses.compute_sync(complex_signal, 'coh', blocks='inter'))
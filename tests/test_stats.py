@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import os
 import random
+import sys
+import pytest
 import numpy as np
 import scipy
 import mne
@@ -326,3 +329,478 @@ def test_compute_nmPLV(epochs):
     assert hPLV < PLV1
     assert hPLV < PLV2
     assert (PLV1 - PLV2) < 1e-2
+
+
+@pytest.mark.filterwarnings('ignore:filter_length')
+def test_pair_connectivity_options(epochs):
+    """
+    Test the connectivity options on real data against the default full computation
+    """
+    data = np.array([epochs.epo1.get_data()[:4], epochs.epo2.get_data()[:4]])
+    n_ch = data.shape[2]
+    freq_bands = {'alpha': [8, 12], 'beta': [12, 20]}
+    full = analyses.pair_connectivity(data, 500, freq_bands, 'plv', epochs_average=False)
+
+    inter = analyses.pair_connectivity(data, 500, freq_bands, 'plv', epochs_average=False, blocks='inter')
+    np.testing.assert_allclose(inter, full[..., :n_ch, n_ch:])
+    pairs = [(0, n_ch), (5, n_ch + 7), (n_ch + 2, 3)]
+    rows, cols = np.array(pairs).T
+    np.testing.assert_allclose(analyses.pair_connectivity(data, 500, freq_bands, 'plv', epochs_average=False,
+                                                          pairs=pairs), full[..., rows, cols], atol=1e-12)
+    np.testing.assert_allclose(analyses.pair_connectivity(data, 500, freq_bands, 'plv', epochs_average=False,
+                                                          n_jobs=2), full)
+    np.testing.assert_allclose(analyses.pair_connectivity(data, 500, freq_bands, 'plv', epochs_average=False,
+                                                          dtype=np.complex64), full, atol=1e-4)
+    np.testing.assert_allclose(analyses.pair_connectivity_batch(data[np.newaxis], 500, freq_bands, 'plv',
+                                                                epochs_average=False)[0], full)
+
+    # windows and decimation against compute_sync on the same analytic signal
+    values = analyses.compute_freq_bands(data, 500, freq_bands)
+    windowed = analyses.pair_connectivity(data, 500, freq_bands, 'plv', epochs_average=False, window=0.5)
+    off_diagonal = ~np.eye(2 * n_ch, dtype=bool)
+    np.testing.assert_allclose(windowed[:, :, 1][..., off_diagonal],
+                               analyses.compute_sync(values[..., 250:500], 'plv',
+                                                     epochs_average=False)[..., off_diagonal], atol=1e-10)
+    decimated = analyses.pair_connectivity(data, 500, freq_bands, 'plv', decim=4)
+    np.testing.assert_allclose(decimated.con, analyses.compute_sync(values[..., ::4], 'plv'))
+
+    # multitaper averages from Epochs
+    full = analyses.compute_single_freq([epochs.epo1[:2], epochs.epo2[:2]], 500, [8, 10])
+    tapers = analyses.compute_single_freq([epochs.epo1[:2], epochs.epo2[:2]], 500, [8, 10], average='tapers')
+    np.testing.assert_allclose(tapers, full.mean(axis=3))
+
+
+def test_compute_sync_blocks(complex_signal):
+    """
+    Test inter- and intra-brain blocks against the full matrix
+    """
+    n_ch = complex_signal.shape[2]
+    for mode in ['plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh', 'ccorr', 'pli', 'wpli']:
+        con = analyses.compute_sync(complex_signal, mode, epochs_average=False)
+        con_inter = analyses.compute_sync(complex_signal, mode, epochs_average=False, blocks='inter')
+        con_intra = analyses.compute_sync(complex_signal, mode, epochs_average=False, blocks='intra')
+        assert con_inter.shape == (2, 3, n_ch, n_ch)
+        assert con_intra.shape == (2, 2, 3, n_ch, n_ch)
+        np.testing.assert_allclose(con_inter, con[..., :n_ch, n_ch:])
+        np.testing.assert_allclose(con_intra[0], con[..., :n_ch, :n_ch])
+        np.testing.assert_allclose(con_intra[1], con[..., n_ch:, n_ch:])
+
+
+def test_cross_spectrum(complex_signal):
+    """
+    Test the complex matmul cross-spectrum against the einsum reference
+    """
+    # (epoch, freq, channel, time), with different channel counts
+    x = complex_signal[0].transpose((0, 2, 1, 3))
+    y = complex_signal[1, :, :3].transpose((0, 2, 1, 3))
+    transpose_axes = (0, 1, 3, 2)
+    np.testing.assert_allclose(analyses._cross_spectrum(x, y),
+                               analyses._multiply_conjugate(x.real, x.imag, transpose_axes,
+                                                            real_y=y.real, imag_y=y.imag))
+    np.testing.assert_allclose(analyses._cross_spectrum_time(x, y),
+                               analyses._multiply_conjugate_time(x.real, x.imag, transpose_axes,
+                                                                 real_y=y.real, imag_y=y.imag))
+
+
+def test_compute_sync_phase_lag_chunks(complex_signal):
+    """
+    Test that chunked pli/wpli match the full time-resolved product
+    """
+    # an odd number of samples leaves a partial last chunk
+    complex_signal = complex_signal[..., :99]
+    x = complex_signal.transpose((1, 3, 0, 2, 4)).reshape(3, 2, 8, 99)
+    im = np.imag(analyses._cross_spectrum_time(x))
+    expected = {'pli': np.abs(np.mean(np.sign(im), axis=-1)),
+                'wpli': np.abs(np.mean(im, axis=-1)) / np.mean(np.abs(im), axis=-1),
+                'wpli2_debiased': (np.sum(im, axis=-1) ** 2 - np.sum(im ** 2, axis=-1)) /
+                                  (np.sum(np.abs(im), axis=-1) ** 2 - np.sum(im ** 2, axis=-1))}
+    off_diagonal = ~np.eye(8, dtype=bool)
+    for mode, con_expected in expected.items():
+        con_expected = con_expected.swapaxes(0, 1)
+        for chunk_size in [1, 16, 500]:
+            con = analyses.compute_sync(complex_signal, mode, epochs_average=False,
+                                        chunk_size=chunk_size)
+            np.testing.assert_allclose(con[..., off_diagonal], con_expected[..., off_diagonal])
+
+
+def test_compute_sync_multiple_modes(complex_signal):
+    """
+    Test that a list of modes gives the same results as one call per mode
+    """
+    modes = ['plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh', 'ccorr', 'pli', 'wpli']
+    for blocks in ['all', 'inter', 'intra']:
+        cons = analyses.compute_sync(complex_signal, modes, blocks=blocks)
+        assert list(cons.keys()) == modes
+        for mode in modes:
+            np.testing.assert_allclose(cons[mode],
+                                       analyses.compute_sync(complex_signal, mode, blocks=blocks))
+
+
+def test_compute_sync_single_precision():
+    """
+    Test the complex64 path against the complex128 one
+    """
+    rng = np.random.default_rng(3)
+    data = rng.standard_normal((2, 4, 3, 500))
+    freq_bands = {'alpha': [8, 12], 'beta': [13, 30]}
+    complex_signal = analyses.compute_freq_bands(data, 250, freq_bands)
+    complex_signal_32 = analyses.compute_freq_bands(data, 250, freq_bands, dtype=np.complex64)
+    assert complex_signal_32.dtype == np.complex64
+    modes = ['plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh', 'ccorr', 'wpli']
+    cons = analyses.compute_sync(complex_signal, modes)
+    cons_32 = analyses.compute_sync(complex_signal_32, modes)
+    for mode in modes:
+        assert cons_32[mode].dtype == np.float32
+        np.testing.assert_allclose(cons_32[mode], cons[mode], atol=1e-5)
+
+
+def test_compute_sync_n_jobs(complex_signal):
+    """
+    Test that parallel chunks of epochs and frequencies match the serial result
+    """
+    modes = ['plv', 'coh', 'wpli']
+    for blocks in ['all', 'inter']:
+        cons = analyses.compute_sync(complex_signal, modes, epochs_average=False, blocks=blocks)
+        cons_parallel = analyses.compute_sync(complex_signal, modes, epochs_average=False,
+                                              blocks=blocks, n_jobs=4)
+        for mode in modes:
+            np.testing.assert_allclose(cons_parallel[mode], cons[mode])
+
+
+def test_sync_accumulator(complex_signal):
+    """
+    Test that accumulating batches of epochs matches compute_sync
+    """
+    modes = ['plv', 'ccorr', 'pli']
+    for blocks in ['all', 'intra']:
+        acc = analyses.SyncAccumulator(modes, blocks=blocks)
+        for start in range(0, 3, 2):
+            acc.update(complex_signal[:, start:start + 2])
+        assert acc.n_epochs == 3
+        cons = acc.result()
+        for mode in modes:
+            np.testing.assert_allclose(cons[mode], analyses.compute_sync(complex_signal, mode, blocks=blocks))
+
+
+def test_compute_sync_windowed(complex_signal):
+    """
+    Test sliding-window connectivity against compute_sync on each window
+    """
+    modes = ['plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh', 'ccorr', 'pli', 'wpli']
+    window, hop = 40, 15
+    cons = analyses.compute_sync_windowed(complex_signal, modes, window, hop, chunk_size=20)
+    n_windows = (100 - window) // hop + 1
+    off_diagonal = ~np.eye(8, dtype=bool)
+    for mode in modes:
+        assert cons[mode].shape == (2, 3, n_windows, 8, 8)
+        for w in range(n_windows):
+            con = analyses.compute_sync(complex_signal[..., w * hop:w * hop + window], mode,
+                                        epochs_average=False)
+            np.testing.assert_allclose(cons[mode][:, :, w][..., off_diagonal], con[..., off_diagonal],
+                                       atol=1e-10)
+
+
+def test_compute_sync_pairs(complex_signal):
+    """
+    Test connectivity on selected channel pairs against the full matrices
+    """
+    modes = ['plv', 'envelope_corr', 'pow_corr', 'coh', 'imaginary_coh', 'ccorr', 'pli', 'wpli']
+    full = analyses.compute_sync(complex_signal, modes, epochs_average=False)
+    pairs = [(0, 5), (1, 4), (7, 2), (0, 1)]
+    rows, cols = np.array(pairs).T
+    cons = analyses.compute_sync(complex_signal, modes, epochs_average=False, pairs=pairs, chunk_size=2)
+    for mode in modes:
+        assert cons[mode].shape == (2, 3, len(pairs))
+        np.testing.assert_allclose(cons[mode], full[mode][..., rows, cols], atol=1e-12)
+
+    mask = np.zeros((8, 8), dtype=bool)
+    mask[rows, cols] = True
+    con = analyses.compute_sync(complex_signal, 'coh', pairs=mask)
+    rows, cols = np.nonzero(mask)
+    np.testing.assert_allclose(con, full['coh'].mean(axis=1)[..., rows, cols], atol=1e-12)
+
+    with pytest.raises(ValueError):
+        analyses.compute_sync(complex_signal, 'plv', pairs=[(0, 8)])
+
+
+@pytest.mark.parametrize('fname', ['complex_signal.npy', 'complex_signal.h5'])
+def test_compute_sync_out_of_core(tmp_path, fname):
+    """
+    Test analytic signal written to disk and streamed by compute_sync
+    """
+    if fname.endswith('.h5'):
+        pytest.importorskip('h5py')
+    rng = np.random.default_rng(8)
+    data = rng.standard_normal((2, 7, 3, 500))
+    freq_bands = {'alpha': [8, 12], 'beta': [12, 20]}
+    complex_signal = analyses.compute_freq_bands(data, 250, freq_bands)
+    on_disk = analyses.compute_freq_bands(data, 250, freq_bands, out=str(tmp_path / fname), epoch_chunk=3)
+    assert not isinstance(on_disk, np.ndarray) or isinstance(on_disk, np.memmap)
+    np.testing.assert_allclose(on_disk[:], complex_signal)
+
+    modes = ['plv', 'coh', 'wpli']
+    for blocks in ['all', 'intra']:
+        cons = analyses.compute_sync(complex_signal, modes, epochs_average=False, blocks=blocks)
+        streamed = analyses.compute_sync(on_disk, modes, epochs_average=False, blocks=blocks, epoch_chunk=2)
+        for mode in modes:
+            np.testing.assert_allclose(streamed[mode], cons[mode], atol=1e-12)
+
+    # the same file can be written again once the HDF5 file is closed
+    if fname.endswith('.h5'):
+        with pytest.raises(OSError):
+            analyses.compute_freq_bands(data, 250, freq_bands, out=str(tmp_path / fname))
+        on_disk.file.close()
+    con = analyses.pair_connectivity(data, 250, freq_bands, 'plv', out=str(tmp_path / fname))
+    np.testing.assert_allclose(analyses.pair_connectivity(data, 250, freq_bands, 'plv', out=str(tmp_path / fname)),
+                               con)
+
+
+def test_compute_sync_numba_fallback(monkeypatch, complex_signal):
+    """
+    Test that the numba backend falls back to NumPy with a warning when numba is missing
+    """
+    # an entry set to None makes `import numba` raise ImportError
+    monkeypatch.setitem(sys.modules, 'numba', None)
+    cons = analyses.compute_sync(complex_signal, 'wpli', epochs_average=False)
+    with pytest.warns(UserWarning, match='numba is not installed'):
+        cons_numba = analyses.compute_sync(complex_signal, 'wpli', epochs_average=False, backend='numba')
+    np.testing.assert_array_equal(cons_numba, cons)
+
+    with pytest.raises(ValueError):
+        analyses.compute_sync(complex_signal, 'pli', backend='cuda')
+
+
+def test_compute_sync_numba_backend(complex_signal):
+    """
+    Test that the compiled numba kernels match the NumPy backend
+    """
+    pytest.importorskip('numba')
+    modes = ['pli', 'wpli', 'wpli2_debiased', 'ccorr']
+    for kwargs in [{}, {'blocks': 'inter'}, {'pairs': [(0, 4), (1, 5), (2, 3)]}]:
+        cons = analyses.compute_sync(complex_signal, modes, epochs_average=False, **kwargs)
+        cons_numba = analyses.compute_sync(complex_signal, modes, epochs_average=False, backend='numba', **kwargs)
+        for mode in modes:
+            np.testing.assert_allclose(cons_numba[mode], cons[mode], atol=1e-10)
+
+
+@pytest.mark.filterwarnings('ignore:filter_length')
+def test_pair_connectivity_batch():
+    """
+    Test batched connectivity against pair_connectivity on each dyad
+    """
+    rng = np.random.default_rng(10)
+    data = rng.standard_normal((3, 2, 4, 5, 500))
+    freq_bands = {'alpha': [8, 12], 'beta': [12, 20]}
+    expected = np.array([analyses.pair_connectivity(dyad, 250, freq_bands, 'plv') for dyad in data])
+    con = analyses.pair_connectivity_batch(data, 250, freq_bands, 'plv', dyad_chunk=2)
+    assert con.shape == (3, 2, 10, 10)
+    np.testing.assert_allclose(con, expected)
+
+    # generator of dyads with different numbers of epochs, automatic chunk size
+    dyads = [data[0], data[1, :, :2], data[2]]
+    cons = analyses.pair_connectivity_batch((dyad for dyad in dyads), 250, freq_bands, ['plv', 'wpli'],
+                                            blocks='inter')
+    for dyad, con in zip(dyads, cons['wpli']):
+        np.testing.assert_allclose(con, analyses.pair_connectivity(dyad, 250, freq_bands, 'wpli', blocks='inter'))
+
+    # the epoch axis follows the participant axis of blocks='intra'
+    intra = analyses.pair_connectivity_batch(data, 250, freq_bands, 'plv', blocks='intra', dyad_chunk=2)
+    assert intra.shape == (3, 2, 2, 5, 5)
+    np.testing.assert_allclose(intra, [analyses.pair_connectivity(dyad, 250, freq_bands, 'plv', blocks='intra')
+                                       for dyad in data])
+    intra = analyses.pair_connectivity_batch(data, 250, freq_bands, 'plv', blocks='intra', epochs_average=False)
+    assert intra.shape == (3, 2, 2, 4, 5, 5)
+    windowed = analyses.pair_connectivity_batch(data, 250, freq_bands, 'plv', blocks='intra', window=1., hop=0.5)
+    np.testing.assert_allclose(windowed[1], analyses.pair_connectivity(data[1], 250, freq_bands, 'plv',
+                                                                       blocks='intra', window=1., hop=0.5))
+
+
+def test_compute_freq_bands_filter_bank():
+    """
+    Test the single-FFT filter bank against FIR filtering and Hilbert transform
+    """
+    rng = np.random.default_rng(11)
+    data = rng.standard_normal((2, 3, 4, 2000))
+    freq_bands = {'theta': [4, 7], 'alpha': [8, 12]}
+    complex_signal = analyses.compute_freq_bands(data, 500, freq_bands)
+    filter_bank = analyses.compute_freq_bands(data, 500, freq_bands, filter_bank=True)
+    assert filter_bank.shape == complex_signal.shape
+    # same zero-phase FIR filtering, the Hilbert transforms only differ near the edges
+    np.testing.assert_allclose(filter_bank.real, complex_signal.real, atol=1e-12)
+    middle = slice(500, 1500)
+    np.testing.assert_allclose(filter_bank[..., middle], complex_signal[..., middle],
+                               atol=0.05 * np.abs(complex_signal).max())
+    assert analyses.compute_freq_bands(data, 500, freq_bands, filter_bank=True,
+                                       dtype=np.complex64).dtype == np.complex64
+    with pytest.raises(ValueError):
+        analyses.compute_freq_bands(data, 500, freq_bands, filter_bank=True, phase='minimum')
+
+
+def test_compute_single_freq_average():
+    """
+    Test taper and band averages computed during the multitaper transform
+    """
+    rng = np.random.default_rng(12)
+    data = rng.standard_normal((2, 3, 4, 500))
+    full = analyses.compute_single_freq(data, 250, [8, 12])
+    tapers = analyses.compute_single_freq(data, 250, [8, 12], average='tapers')
+    np.testing.assert_allclose(tapers, full.mean(axis=3))
+    band = analyses.compute_single_freq(data, 250, [8, 12], average='band', decim=5)
+    assert band.shape == (2, 3, 4, 1, 100)
+    np.testing.assert_allclose(band[:, :, :, 0], full.mean(axis=(3, 4))[..., ::5])
+    # frequency batches of one frequency, and participants given as Epochs
+    info = mne.create_info(4, 250, 'eeg')
+    epochs = [mne.EpochsArray(participant, info, verbose=False) for participant in data]
+    np.testing.assert_allclose(analyses.compute_single_freq(epochs, 250, [8, 12], average='tapers',
+                                                            max_memory=1), tapers)
+    with pytest.raises(ValueError):
+        analyses.compute_single_freq(data, 250, [8, 12], average='time')
+
+
+@pytest.mark.filterwarnings('ignore:filter_length')
+def test_pair_connectivity_decim():
+    """
+    Test the decimation planner and decimated connectivity
+    """
+    freq_bands = {'alpha': [8, 12], 'beta': [12, 20]}
+    assert analyses.plan_decimation(1000, freq_bands) == 12
+    assert analyses.plan_decimation(1000, [8, 13]) == 19
+    assert analyses.plan_decimation(50, freq_bands) == 1
+
+    rng = np.random.default_rng(13)
+    data = rng.standard_normal((2, 3, 4, 1000))
+    result = analyses.pair_connectivity(data, 500, freq_bands, 'plv', decim='auto')
+    assert (result.sfreq, result.decim) == (83.33333333333333, 6)
+    values = analyses.compute_freq_bands(data, 500, freq_bands)[..., ::6]
+    np.testing.assert_allclose(result.con, analyses.compute_sync(values, 'plv'))
+    windowed = analyses.pair_connectivity(data, 500, freq_bands, 'plv', decim=5, window=0.5)
+    assert windowed.sfreq == 100 and windowed.con.shape == (2, 4, 8, 8)
+    for decim in [0, -2, 2.5]:
+        with pytest.raises(ValueError):
+            analyses.pair_connectivity(data, 500, freq_bands, 'plv', decim=decim)
+
+
+def test_compute_nmPLV_matrix():
+    """
+    Test the n:m phase locking matrix on a 1:2 coupled signal
+    """
+    rng = np.random.default_rng(14)
+    times = np.arange(1000) / 250
+    phase = rng.uniform(0, 2 * np.pi, (3, 1, 1))
+    noise = 0.1 * rng.standard_normal((2, 3, 2, 1000))
+    data = np.array([np.cos(2 * np.pi * 6 * times + phase),
+                     np.cos(2 * np.pi * 12 * times + 2 * phase)]) + noise
+    con = analyses.compute_nmPLV_matrix(data, 250, [5, 15])
+    assert con.shape == (10, 10, 2, 2)
+    # participant 1 at 6 Hz locks 1:2 with participant 2 at 12 Hz
+    assert con[1, 7].min() > 0.9
+    assert con[1, 6].max() < 0.3
+
+    # the diagonal is the inter-brain PLV
+    complex_signal = analyses.compute_single_freq(data, 250, [5, 15], average='tapers')
+    plv = analyses.compute_sync(complex_signal, 'plv', blocks='inter')
+    np.testing.assert_allclose(np.diagonal(con, axis1=0, axis2=1).transpose((2, 0, 1)), plv)
+
+
+def test_xwt():
+    """
+    Test the cross wavelet transform against the CWT of single channel pairs
+    """
+    epo = mne.read_epochs(os.path.join("data", "participant2-epo.fif"), preload=True, verbose=False)
+    epo1 = epo.copy().pick(range(3))[:4]
+    epo2 = epo.copy().pick(range(3, 6))[4:8]
+    freqs = np.arange(8, 12)
+    cross = analyses.xwt(epo1, epo2, freqs, mode='xwt')
+    assert cross.shape == (3, 3, 4, 4, epo.times.size)
+
+    Ws = mne.time_frequency.morlet(epo.info['sfreq'], freqs, n_cycles=5.0, zero_mean=True)
+    out1 = mne.time_frequency.tfr.cwt(epo1.get_data()[:, 2], Ws, use_fft=True, mode='same')
+    out2 = mne.time_frequency.tfr.cwt(epo2.get_data()[:, 1], Ws, use_fft=True, mode='same')
+    np.testing.assert_allclose(cross[2, 1], out1 * out2.conj())
+    np.testing.assert_allclose(analyses.xwt(epo1, epo2, freqs, mode='power'), np.abs(cross))
+
+
+def test_xwt_wtc():
+    """
+    Test smoothed wavelet coherence on coupled and independent channels
+    """
+    rng = np.random.default_rng(15)
+    times = np.arange(1000) / 250
+    info = mne.create_info(2, 250, 'eeg')
+    data1 = rng.standard_normal((3, 2, 1000))
+    data2 = rng.standard_normal((3, 2, 1000))
+    # channel 0 of both participants shares a phase-shifted 10 Hz oscillation
+    data1[:, 0] += 3 * np.sin(2 * np.pi * 10 * times)
+    data2[:, 0] += 3 * np.sin(2 * np.pi * 10 * times + 1)
+    epo1 = mne.EpochsArray(data1, info, verbose=False)
+    epo2 = mne.EpochsArray(data2, info, verbose=False)
+    freqs = np.arange(6, 15)
+    wtc = analyses.xwt(epo1, epo2, freqs, mode='wtc')
+    assert wtc.shape == (2, 2, 3, 9, 1000)
+    assert np.all((wtc >= 0) & (wtc <= 1 + 1e-12))
+    alpha = freqs == 10
+    assert wtc[0, 0][:, alpha, 200:800].mean() > 0.95
+    assert wtc[1, 1][:, alpha, 200:800].mean() < 0.7
+    np.testing.assert_allclose(analyses.xwt(epo1, epo1, freqs, mode='wtc')[1, 1], 1)
+
+
+def test_xwt_reductions(tmp_path):
+    """
+    Test averaged, decimated, memory-mapped and generator outputs of xwt
+    """
+    rng = np.random.default_rng(16)
+    info = mne.create_info(3, 250, 'eeg')
+    epo1 = mne.EpochsArray(rng.standard_normal((4, 3, 500)), info, verbose=False)
+    epo2 = mne.EpochsArray(rng.standard_normal((4, 3, 500)), info, verbose=False)
+    freqs = np.arange(8, 13)
+    cross = analyses.xwt(epo1, epo2, freqs, mode='xwt')
+
+    power = analyses.xwt(epo1, epo2, freqs, mode='power', average=['epochs', 'time'])
+    assert power.shape == (3, 3, 5)
+    np.testing.assert_allclose(power, np.abs(cross).mean(axis=(2, 4)))
+    phase = analyses.xwt(epo1, epo2, freqs, mode='phase', average='band', decim=10)
+    assert phase.shape == (3, 3, 4, 50)
+    np.testing.assert_allclose(phase, np.angle(cross[..., ::10].mean(axis=3)))
+
+    wtc = analyses.xwt(epo1, epo2, freqs, mode='wtc', out=str(tmp_path / 'wtc.npy'))
+    assert isinstance(wtc, np.memmap)
+    blocks = list(analyses.xwt(epo1, epo2, freqs, mode='wtc', generator=True))
+    np.testing.assert_allclose(np.concatenate([block for _, block in blocks]), wtc)
+    assert blocks[0][0] == slice(0, 3)
+
+
+def test_xwt_significance():
+    """
+    Test Monte-Carlo p-values of xwt
+    """
+    rng = np.random.default_rng(17)
+    info = mne.create_info(2, 100, 'eeg')
+    times = np.arange(400) / 100
+    data1 = rng.standard_normal((4, 2, 400))
+    data2 = rng.standard_normal((4, 2, 400))
+    # a shared 10 Hz oscillation on the first channels only
+    data1[:, 0] += 2 * np.sin(2 * np.pi * 10 * times)
+    data2[:, 0] += 2 * np.sin(2 * np.pi * 10 * times + 1)
+    epo1 = mne.EpochsArray(data1, info, verbose=False)
+    epo2 = mne.EpochsArray(data2, info, verbose=False)
+    freqs = np.arange(8, 13)
+
+    result = analyses.xwt_significance(epo1, epo2, freqs, n_surrogates=40, batch_size=10,
+                                       average=['epochs', 'time'], seed=0)
+    np.testing.assert_allclose(result.data, analyses.xwt(epo1, epo2, freqs, mode='wtc',
+                                                         average=['epochs', 'time']))
+    assert result.pvalues.shape == (2, 2, 5)
+    assert np.all(result.pvalues[0, 0] == 1 / 41)
+    assert np.all(result.pvalues[1, 1] > 0.05)
+
+    # the random streams do not depend on the number of workers
+    phase = analyses.xwt_significance(epo1, epo2, freqs, mode='power', n_surrogates=20, batch_size=5,
+                                      surrogate='phase', decim=10, seed=0)
+    assert phase.pvalues.shape == (2, 2, 4, 5, 40)
+    assert np.all((phase.pvalues > 0) & (phase.pvalues <= 1))
+    parallel = analyses.xwt_significance(epo1, epo2, freqs, mode='power', n_surrogates=20, batch_size=5,
+                                         surrogate='phase', decim=10, seed=0, n_jobs=2)
+    np.testing.assert_array_equal(parallel.pvalues, phase.pvalues)
+
+    with pytest.raises(ValueError):
+        analyses.xwt_significance(epo1, epo2, freqs, mode='phase')